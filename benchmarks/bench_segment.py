@@ -0,0 +1,67 @@
+# coding: utf-8
+"""
+Compares WordTokenizer.segment() with WordTokenizer.tokenize(): checks that the boundaries of the
+tokens are the same and times both.
+
+Both use the dialect pack unmodified: when its adjustment rules merge or split tokens, segment()
+takes the boundaries from tokenize() and is not faster (see WordTokenizer.segment()).
+
+    python benchmarks/bench_segment.py [--pack <dialect pack>] [--text <file>] [--repeat 200]
+"""
+import argparse
+import time
+from pathlib import Path
+
+from botok import Config, WordTokenizer
+
+TEXTS = [
+    "tests/resources/test_file_to_tokenize.txt",
+    "tests/resources/test_file_to_tokenize_pybo.txt",
+]
+
+
+def best_of(func, string, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(string)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pack", help="path to a dialect pack (default: the default pack)")
+    parser.add_argument("--text", help="text file (default: the texts of tests/resources)")
+    parser.add_argument("--repeat", type=int, default=200, help="times the text is repeated")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs, the best is kept")
+    args = parser.parse_args()
+
+    config = Config.from_path(args.pack) if args.pack else Config()
+    wt = WordTokenizer(config=config)
+    if wt.adj.changes_boundaries():
+        print("the adjustment rules merge or split tokens: segment() calls tokenize()")
+
+    root = Path(__file__).resolve().parent.parent
+    paths = [Path(args.text)] if args.text else [root / t for t in TEXTS]
+    text = "\n".join(p.read_text(encoding="utf-8-sig") for p in paths)
+    string = "\n".join([text] * args.repeat)
+
+    for split_affixes in [True, False]:
+        tok_time, tokens = best_of(
+            lambda s: wt.tokenize(s, split_affixes=split_affixes), string, args.runs
+        )
+        seg_time, bounds = best_of(
+            lambda s: wt.segment(s, split_affixes=split_affixes), string, args.runs
+        )
+        expected = [(t.start, t.start + t.len) for t in tokens]
+        print(
+            f"split_affixes={split_affixes}: {len(string)} chars, {len(bounds)} tokens, "
+            f"tokenize() {tok_time:.3f}s, segment() {seg_time:.3f}s "
+            f"({tok_time / seg_time:.1f}x), "
+            f"boundaries {'identical' if bounds == expected else 'DIFFERENT'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -16,18 +16,24 @@ from .modifytokens.tokenmerge import TokenMerge
 from .modifytokens.tokensplit import TokenSplit
 from .text.pipelinebase import PipelineBase
 from .text.text import Text
-from .textunits.bostring import BoString
+from .textunits.bostring import BoString, NfcWarning
 from .textunits.bosyl import BoSyl
 from .textunits.sylcomponents import SylComponents
 from .third_party.cqlparser import Query, parse_cql_query, replace_token_attributes
+from .tokenizers.asynctokenizer import AsyncWordTokenizer
 from .tokenizers.chunktokenizer import ChunkTokenizer
+from .tokenizers.columnar import TokenColumns
 from .tokenizers.paragraphtokenizer import paragraph_tokenizer
+from .tokenizers.registry import TokenizerRegistry
 from .tokenizers.sentencetokenizer import sentence_tokenizer
 from .tokenizers.stacktokenizer import tokenize_in_stacks
 from .tokenizers.token import Token
 from .tokenizers.tokenize import Tokenize
 from .tokenizers.wordtokenizer import WordTokenizer
 from .tries.basictrie import BasicTrie
+from .tries.compacttrie import CompactTrie
+from .tries.mappedtrie import MappedTrie, convert_pickled_trie
+from .tries.overlaytrie import OverlayTrie
 from .tries.trie import Trie
 from .utils.expose_data import expose_data
 from .utils.unicode_normalization import normalize_unicode
@@ -6,8 +6,8 @@ from ..vars import ChunkMarkers as u
 
 
 class ChunkFrameworkBase:
-    def __init__(self, string, ignore_chars=None):
-        self.bs = BoString(string, ignore_chars=ignore_chars)
+    def __init__(self, string, ignore_chars=None, expand_nfc=False):
+        self.bs = BoString(string, ignore_chars=ignore_chars, expand_nfc=expand_nfc)
 
     @staticmethod
     def merge_chunks(chunks, merge_condition_func):
@@ -17,27 +17,15 @@ class ChunkFrameworkBase:
         :param merge_condition_func: function that takes start-end indices of the sub-string of both
                                         previous and current chunks, does a test and returns a bool
         """
-        num = 0
-        while num <= len(chunks) - 1:
-            current = chunks[num]
-            if num - 1 >= 0:
-                previous = chunks[num - 1]
-                if merge_condition_func(previous, current):
-                    inc = 0
-                    while not previous:
-                        inc += 1
-                        previous = chunks[num - 1 - inc]
-
-                    new = (previous[0], previous[1], previous[2] + current[2])
-                    chunks[num - 1 - inc] = (
-                        previous[0],
-                        previous[1],
-                        previous[2] + current[2],
-                    )
-                    del chunks[num]
-                    num -= 1
-
-            num += 1
+        # the merged chunks are built in a new list, then copied in place
+        merged = []
+        for current in chunks:
+            if merged and merge_condition_func(merged[-1], current):
+                previous = merged[-1]
+                merged[-1] = (previous[0], previous[1], previous[2] + current[2])
+            else:
+                merged.append(current)
+        chunks[:] = merged
         return chunks
 
     @staticmethod
@@ -65,16 +53,26 @@ class ChunkFrameworkBase:
         :type piped_chunk_func: callable
         :type yes: int
         """
-        for i, chunk in enumerate(chunks):
-            if chunk[0] == to_chunk_marker:
-                new = piped_chunk_func(chunk[1], chunk[1] + chunk[2], yes=yes)
-                if new:
-                    del chunks[i]
-                    for j, n_chunk in enumerate(new):
-                        if n_chunk[0] != yes:
-                            chunks.insert(i + j, (chunk[0], n_chunk[1], n_chunk[2]))
-                        else:
-                            chunks.insert(i + j, n_chunk)
+        piped = []
+        for chunk in chunks:
+            # the new chunks following the first one are re-chunked in turn if they match the marker
+            pending = [chunk]
+            while pending:
+                chunk = pending.pop()
+                if chunk[0] == to_chunk_marker:
+                    new = piped_chunk_func(chunk[1], chunk[1] + chunk[2], yes=yes)
+                    if new:
+                        new = [
+                            n_chunk
+                            if n_chunk[0] == yes
+                            else (chunk[0], n_chunk[1], n_chunk[2])
+                            for n_chunk in new
+                        ]
+                        piped.append(new[0])
+                        pending.extend(reversed(new[1:]))
+                        continue
+                piped.append(chunk)
+        chunks[:] = piped
         return chunks
 
     def chunk_using(self, condition_func, start, end, yes, no):
@@ -129,45 +127,30 @@ class ChunkFrameworkBase:
         return self.merge_similar_chunks(chunks)
 
     def merge_skippable_punct(self, chunks):
-        i = 0
-        while i <= len(chunks) - 1:
-            current = chunks[i]
-            # first element
-            if i == 0 and len(chunks) - 1 >= 1:
-                to_del = True
-                for char_idx in range(current[1], current[1] + current[2]):
-                    if not self.__is_skippable_punct(char_idx):
-                        to_del = False
-
-                if to_del:
-                    new_chunk = (
-                        chunks[i + 1][0],
-                        current[1],
-                        chunks[i + 1][1] + chunks[i + 1][2],
-                    )
-                    chunks[i + 1] = new_chunk
-                    del chunks[i]
-                    i -= 1
-
-            # remaining ones
-            if i - 1 >= 0:
-                to_del = True
-                for char_idx in range(current[1], current[1] + current[2]):
-                    if not self.__is_skippable_punct(char_idx):
-                        to_del = False
-
-                if to_del:
-                    new_chunk = (
-                        chunks[i - 1][0],
-                        chunks[i - 1][1],
-                        current[2] + chunks[i - 1][2],
-                    )
-                    chunks[i - 1] = new_chunk
-                    del chunks[i]
-                    i -= 1
-            i += 1
+        merged = []
+        leading = True
+        for current in chunks:
+            if leading and merged:
+                # the first chunks are merged into the following one while they are skippable
+                if self.__is_skippable_chunk(merged[-1]):
+                    first = merged[-1]
+                    merged[-1] = (current[0], first[1], current[1] + current[2] - first[1])
+                    continue
+                leading = False
+            if merged and not leading and self.__is_skippable_chunk(current):
+                previous = merged[-1]
+                merged[-1] = (previous[0], previous[1], current[2] + previous[2])
+            else:
+                merged.append(current)
+        chunks[:] = merged
         return self.merge_similar_chunks(chunks)
 
+    def __is_skippable_chunk(self, chunk):
+        return all(
+            self.__is_skippable_punct(char_idx)
+            for char_idx in range(chunk[1], chunk[1] + chunk[2])
+        )
+
     def __is_skippable_punct(self, char_idx):
         return self.bs.base_structure[char_idx] == a.TSEK or self.__is_space(char_idx)
 
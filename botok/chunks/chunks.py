@@ -1,7 +1,18 @@
 # coding: utf-8
+import re
+import warnings
+from array import array
+
 from .chunkframework import ChunkFramework
+from .numpychunks import NumpyChunker
+from .singlepass import SinglePassChunker
 from ..vars import ChunkMarkers as c
 from ..vars import CharMarkers as a
+from ..textunits.bostring import NfcWarning
+from ..textunits.charcategories import tibetan
+
+# the categories of the chars removed from the cleaned syllables
+SYL_SKIPPED = bytes([a.TSEK, a.TRANSPARENT])
 
 
 class Chunks(ChunkFramework):
@@ -19,12 +30,40 @@ class Chunks(ChunkFramework):
 
     .. note:: Following Tibetan usage, it does not consider space as a punctuation mark.
     Spaces get attached to the chunk preceding them.
+
+    The pipeline is either run pass after pass on the whole list of chunks ("pipeline" engine),
+    or by ``SinglePassChunker`` ("single_pass" engine), that produces the same chunks in a single pass.
+    The "numpy" engine is ``NumpyChunker``, a single pass with the tests on the chars vectorized,
+    that requires NumPy.
+
+    With ``expand_nfc``, the NFC chars that have a canonical expansion are expanded before chunking
+    (see ``BoString``).
     """
 
-    def __init__(self, string, ignore_chars=None):
-        ChunkFramework.__init__(self, string, ignore_chars=ignore_chars)
+    ENGINES = ["pipeline", "single_pass", "numpy"]
+
+    def __init__(self, string, ignore_chars=None, engine="pipeline", expand_nfc=False):
+        if engine not in self.ENGINES:
+            raise SyntaxError(f"engine should be either one of {self.ENGINES}")
+        ChunkFramework.__init__(
+            self, string, ignore_chars=ignore_chars, expand_nfc=expand_nfc
+        )
+        self.engine = engine
 
     def make_chunks(self, indices=True, gen=False, space_as_punct=False):
+        if self.engine == "single_pass":
+            chunker = SinglePassChunker(self.bs)
+            chunks = chunker.make_chunks(space_as_punct=space_as_punct)
+        elif self.engine == "numpy":
+            chunker = NumpyChunker(self.bs)
+            chunks = chunker.make_chunks(space_as_punct=space_as_punct)
+        else:
+            chunks = self.pipe_chunks(space_as_punct=space_as_punct)
+        if not indices:
+            return self.get_chunked(chunks, gen=gen)
+        return chunks
+
+    def pipe_chunks(self, space_as_punct=False):
         chunks = self.chunk_bo_chars()
         if space_as_punct:
             chunks = self.pipe_chunk(
@@ -45,8 +84,6 @@ class Chunks(ChunkFramework):
         chunks = self.pipe_chunk(chunks, self.chunk_latin, c.OTHER.value, c.LATIN.value)
         if not space_as_punct:
             chunks = self.merge_skippable_punct(chunks)
-        if not indices:
-            return self.get_chunked(chunks, gen=gen)
         return chunks
 
 
@@ -55,55 +92,359 @@ class TokChunks(Chunks):
     This class uses the chunks produced by ``Chunks`` to identify Tibetan syllables and clean them.
     Thus produces pre-processed Tibetan text that can be further processed.
 
-    Every chunk produced by ``Chunks`` is wrapped into a tuple containing:
+    The chunks produced by ``Chunks`` are kept in ``spans``. Their cleaned syllables (the indices
+    to every non-space and non-tsek char in every syllable chunk) are stored contiguously:
+            - syl_chars: the indices of the chars of all the cleaned syllables, in an array
+            - syl_offsets: the cleaned syllable of the chunk i is syl_chars[syl_offsets[i]:syl_offsets[i + 1]]
+
+    ``chunks`` wraps every chunk into a tuple containing:
             - either None or a list containing the cleaned syllable
-              (the indices to every non-space and non-tsek char in every syllable chunk)
             - the chunk itself
 
+    The cleaned syllables are interned in a vocabulary local to the document:
+            - vocab: every distinct cleaned syllable, in order of appearance
+            - syl_ids: for every chunk, the index of its syllable in vocab, or None
+
+    ``iter_windows()`` and ``stream()`` chunk a text given in pieces, only holding a window of it.
+    ``find_punct_cuts()`` cuts a text in pieces that can be tokenized separately.
     """
 
-    def __init__(self, string, ignore_chars=None, space_as_punct=False):
-        super().__init__(string, ignore_chars=ignore_chars)
-        self.chunks = None
+    # the chars that can start a syllable
+    SYL_START = {
+        a.CONS,
+        a.SUB_CONS,
+        a.VOW,
+        a.IN_SYL_MARK,
+        a.NON_BO_NON_SKRT,
+        a.SKRT_CONS,
+        a.SKRT_SUB_CONS,
+        a.SKRT_VOW,
+    }
+
+    def __init__(
+        self,
+        string,
+        ignore_chars=None,
+        space_as_punct=False,
+        engine="pipeline",
+        expand_nfc=False,
+    ):
+        super().__init__(
+            string, ignore_chars=ignore_chars, engine=engine, expand_nfc=expand_nfc
+        )
+        self.spans = None
+        self.syl_chars = None
+        self.syl_offsets = None
+        self.vocab = None
+        self.syl_ids = None
         self.space_as_punct = space_as_punct
+        self._chunks = None
 
     def serve_syls_to_trie(self):
-        chunks = []
-        for chunk in self.make_chunks(space_as_punct=self.space_as_punct):
-            if chunk[0] == c.TEXT:
-                syl = self.__get_text_chars(chunk[1], chunk[1] + chunk[2])
-                chunks.append((syl, chunk))
+        spans = self.make_chunks(space_as_punct=self.space_as_punct)
+        structure = bytes(self.bs.base_structure)
+        self._index_syls(
+            spans,
+            (
+                self.__clean_syl(structure, start, start + length)
+                if marker == c.TEXT
+                else None
+                for marker, start, length in spans
+            ),
+        )
+
+    def _index_syls(self, spans, syls):
+        """
+        :param spans: the chunks, as (marker, start, length)
+        :param syls: for every chunk, the (indices of the chars, text) of its cleaned syllable, or None
+        """
+        syl_chars, syl_offsets = array("q"), array("q", [0])
+        vocab, syl_ids, known = [], [], {}
+        for cleaned in syls:
+            if cleaned is not None:
+                syl, text = cleaned
+                syl_chars.extend(syl)
+                syl_id = known.get(text)
+                if syl_id is None:
+                    syl_id = known[text] = len(vocab)
+                    vocab.append(text)
+                syl_ids.append(syl_id)
             else:
-                chunks.append((None, chunk))
-        self.chunks = chunks
+                syl_ids.append(None)
+            syl_offsets.append(len(syl_chars))
+        self.spans = spans
+        self.syl_chars = syl_chars
+        self.syl_offsets = syl_offsets
+        self.vocab = vocab
+        self.syl_ids = syl_ids
+        self._chunks = None
+
+    @property
+    def chunks(self):
+        """
+        The (syl, chunk) tuples, built from ``spans`` and the syllable arrays on first access.
+        """
+        if self._chunks is None and self.spans is not None:
+            self._chunks = [
+                (self.get_syl_chars(i), span) for i, span in enumerate(self.spans)
+            ]
+        return self._chunks
+
+    @chunks.setter
+    def chunks(self, chunks):
+        """
+        Replaces the (syl, chunk) tuples, as custom pipelines do between ``serve_syls_to_trie()`` and
+        the tokenizer: ``spans`` and the syllable arrays are built again from them. They should not be
+        modified in place afterwards.
+        """
+        string = self.bs.string
+        self._index_syls(
+            [chunk for _, chunk in chunks],
+            (
+                (syl, "".join([string[i] for i in syl])) if syl is not None else None
+                for syl, _ in chunks
+            ),
+        )
+        self._chunks = chunks
+
+    def get_syl_chars(self, i):
+        """
+        :return: the indices of the chars of the cleaned syllable of the chunk i, or None
+        """
+        if self.syl_ids[i] is None:
+            return None
+        return self.syl_chars[self.syl_offsets[i] : self.syl_offsets[i + 1]].tolist()
+
+    @classmethod
+    def iter_windows(
+        cls,
+        pieces,
+        ignore_chars=None,
+        space_as_punct=False,
+        engine="single_pass",
+        window=65536,
+    ):
+        """
+        Chunks a text given as an iterable of strings, without holding all of it in memory.
+
+        The pieces are gathered until they reach ``window`` chars, then chunked. The chunks up to the
+        last safe cut (see ``find_safe_cut()``) are served: their chunking can't be changed by the text
+        that follows. The rest of the text is kept and chunked again with the next pieces.
+        Text without any safe cut (a long run of Latin, of syllables without tseks, etc.) is held up to
+        ``2 * window`` chars, then cut ``window`` chars before its end: only there, the chunk spanning
+        the cut is split in two.
+
+        :param pieces: the text, in pieces of any size (lines, file reads, etc.)
+        :param window: minimal number of chars chunked at once
+        :return: a generator of TokChunks (on which ``serve_syls_to_trie()`` was called), each with an
+                 ``offset`` attribute: the index in the whole text of their first char.
+                 Their chunks are the ones of the whole text.
+        """
+        offset = 0
+        held, held_len = [], 0
+        threshold = window
+        pieces = iter(pieces)
+        while True:
+            piece = next(pieces, None)
+            if piece is not None:
+                held.append(piece)
+                held_len += len(piece)
+                if held_len < threshold:
+                    continue
+            string = "".join(held)
+            if not string:
+                return
+
+            chunks = cls(
+                string,
+                ignore_chars=ignore_chars,
+                space_as_punct=space_as_punct,
+                engine=engine,
+            )
+            chunks.serve_syls_to_trie()
+            end = chunks.bs.len if piece is None else chunks.find_safe_cut()
+            if not end and held_len >= 2 * window:
+                # no safe cut in two windows: the text before the last window is chunked alone
+                end = held_len - window
+                chunks = cls(
+                    string[:end],
+                    ignore_chars=ignore_chars,
+                    space_as_punct=space_as_punct,
+                    engine=engine,
+                )
+                chunks.serve_syls_to_trie()
+            if end:
+                if end < chunks.bs.len:
+                    chunks.truncate(end)
+                chunks.offset = offset
+                yield chunks
+                offset += end
+                threshold = window
+            else:
+                # wait for the second window
+                threshold = 2 * window
+            held = [string[end:]]
+            held_len = len(held[0])
+            if piece is None:
+                return
+
+    @classmethod
+    def stream(cls, pieces, **kwargs):
+        """
+        Chunks a text given as an iterable of strings, see ``iter_windows()``.
+
+        :return: a generator of the (syl, chunk) tuples of ``serve_syls_to_trie()``, with the
+                 indices of the whole text.
+        """
+        for chunks in cls.iter_windows(pieces, **kwargs):
+            offset = chunks.offset
+            for i, chunk in enumerate(chunks.spans):
+                syl = chunks.get_syl_chars(i)
+                if syl is not None:
+                    syl = [j + offset for j in syl]
+                yield syl, (chunk[0], chunk[1] + offset, chunk[2])
+
+    @classmethod
+    def find_punct_cuts(
+        cls, string, size, ignore_chars=None, space_as_punct=False, window=4096
+    ):
+        """
+        Cuts a text in pieces of about ``size`` chars that are tokenized as in the whole text: every
+        piece but the last ends with punctuation, and the next one starts with a syllable (see
+        ``find_punct_cut()``). Only windows of ``window`` chars are chunked, after every ``size`` chars.
+
+        :return: the start of every piece, the first being 0
+        """
+        cuts = [0]
+        pos = size
+        # the chars of the windows were already checked, or will be, when tokenizing the pieces
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", NfcWarning)
+            while pos < len(string):
+                chunks = cls(
+                    string[pos : pos + window],
+                    ignore_chars=ignore_chars,
+                    space_as_punct=space_as_punct,
+                    engine="single_pass",
+                )
+                chunks.serve_syls_to_trie()
+                cut = chunks.find_punct_cut()
+                if cut:
+                    cuts.append(pos + cut)
+                    pos += cut + size
+                else:
+                    # the windows overlap, so a cut at the end of a window is found in the next one
+                    pos += window // 2
+        return cuts
+
+    def find_punct_cut(self):
+        """
+        :return: the start of the first syllable following a punctuation chunk containing a shad, or 0.
+                 No word of the trie can span a punctuation chunk (see ``Tokenize.tokenize()``), and
+                 neither the chunks nor the tokens around it depend on the text on the other side.
+                 The first and last chunks are ignored, since the string may be a cut window.
+        """
+        structure = self.bs.base_structure
+        for i in range(2, len(self.spans) - 1):
+            chunk = self.spans[i]
+            previous = self.spans[i - 1]
+            start = chunk[1]
+            if (
+                chunk[0] == c.TEXT
+                and previous[0] == c.PUNCT
+                and previous[1] + previous[2] == start
+                and structure[start] in self.SYL_START
+                and a.NORMAL_PUNCT in structure[previous[1] : start]
+            ):
+                return start
+        return 0
+
+    def find_safe_cut(self):
+        """
+        :return: the start of the last chunk that the text following this string can't modify, or 0:
+                 a syllable starting with a letter right after a chunk ending with a tsek, or a chunk
+                 following a chunk that is not a syllable, but for the last chunk, which the following
+                 text can merge with.
+        """
+        structure = self.bs.base_structure
+        for i in range(len(self.spans) - 1, 0, -1):
+            chunk = self.spans[i]
+            previous = self.spans[i - 1]
+            start = chunk[1]
+            if previous[1] + previous[2] != start:
+                continue
+            if (
+                chunk[0] == c.TEXT
+                and structure[start] in self.SYL_START
+                and structure[start - 1] == a.TSEK
+            ):
+                return start
+            if previous[0] != c.TEXT and i < len(self.spans) - 1:
+                return start
+        return 0
+
+    def truncate(self, end):
+        """Only keeps the chunks before the index ``end``, that should be a chunk boundary."""
+        n = 0
+        while n < len(self.spans) and self.spans[n][1] < end:
+            n += 1
+        self.spans = self.spans[:n]
+        self.syl_ids = self.syl_ids[:n]
+        self.syl_offsets = self.syl_offsets[: n + 1]
+        self.syl_chars = self.syl_chars[: self.syl_offsets[n]]
+        self._chunks = None
 
     def get_syls(self):
         syls = []
+        structure = bytes(self.bs.base_structure)
         for chunk in self.make_chunks(space_as_punct=self.space_as_punct):
             if chunk[0] == c.TEXT:
-                char_idxs = self.__get_text_chars(chunk[1], chunk[1] + chunk[2])
-                syls.append("".join([self.bs.string[i] for i in char_idxs]))
+                syls.append(self.__clean_syl(structure, chunk[1], chunk[1] + chunk[2])[1])
         return syls
 
-    def __get_text_chars(self, start_idx, end_idx):
+    def __clean_syl(self, structure, start_idx, end_idx):
         """
-        Removes all the spaces and tseks from a given syllable by only keeping the characters that
-        pass ``__is_syl_text()``.
+        Removes all the spaces and tseks from a given syllable.
 
+        :param structure: ``BoString.base_structure``, as bytes
         :param start_idx: starting index of the syllable-chunk to clean
         :param end_idx: its ending index
-        :type start_idx: int
-        :type end_idx: int
-        :return: a list of indices corresponding to the chars of the cleaned syllable
+        :return: the indices of the chars of the cleaned syllable (a range or a list), and its text
         """
-        return [i for i in range(start_idx, end_idx) if self.__is_syl_text(i)]
+        cats = structure[start_idx:end_idx]
+        n_chars = len(cats.rstrip(SYL_SKIPPED))
+        if len(cats.translate(None, SYL_SKIPPED)) == n_chars:
+            # the usual syllable: the chars to remove are all at its end
+            return (
+                range(start_idx, start_idx + n_chars),
+                self.bs.string[start_idx : start_idx + n_chars],
+            )
+        syl = [i for i, cat in enumerate(cats, start_idx) if cat not in SYL_SKIPPED]
+        return syl, "".join([self.bs.string[i] for i in syl])
 
-    def __is_syl_text(self, char_idx):
-        """
-        Tests whether the character at the given index is part of the cleaned syllable or not.
-        """
-        return (
-            self.bs.base_structure[char_idx] != a.TSEK
-            and self.bs.base_structure[char_idx] != a.TRANSPARENT
-            and self.bs.base_structure[char_idx] != a.SKRT_LONG_VOW
-        ) or self.bs.base_structure[char_idx] == a.SKRT_LONG_VOW
+
+# the chars of syllables that don't need the chunk pipeline to be split
+SYL_CHARS = "".join(
+    sorted(
+        char
+        for char, cat in tibetan.items()
+        if cat in TokChunks.SYL_START and len(char) == 1
+    )
+)
+TSEKS = "".join(char for char, cat in tibetan.items() if cat == a.TSEK)
+SIMPLE_SYLS = re.compile(
+    f"[{re.escape(SYL_CHARS)}]+(?:[{TSEKS}][{re.escape(SYL_CHARS)}]+)*[{TSEKS}]?"
+)
+TSEK_SPLIT = re.compile(f"[{TSEKS}]")
+
+
+def get_syls(string):
+    """
+    Same as ``TokChunks(string).get_syls()``, but much faster for the words and lemmas of the
+    dictionary: syllables separated by single tseks are split directly, the rest goes through
+    ``TokChunks``.
+    """
+    if SIMPLE_SYLS.fullmatch(string):
+        syls = TSEK_SPLIT.split(string)
+        return syls[:-1] if not syls[-1] else syls
+    return TokChunks(string).get_syls()
@@ -0,0 +1,114 @@
+# coding: utf-8
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ..vars import CharMarkers as a
+from ..vars import ChunkMarkers as u
+from .singlepass import (
+    CLASS_MARKERS,
+    CLASS_TABLES,
+    PUNCT,
+    PUNCT_CONTEXT,
+    SYL_END,
+    SinglePassChunker,
+)
+
+# markers of the runs of non-Tibetan chars, indexed by their code in ``NumpyChunker.non_bo``
+NON_BO_MARKERS = [u.OTHER.value, u.CJK.value, u.LATIN.value]
+
+
+class NumpyChunker(SinglePassChunker):
+    """
+    ``SinglePassChunker`` where the tests on the chars are done on NumPy arrays, for the whole string
+    at once: the classes of the chars and their runs, the syllable boundaries, the runs of
+    non-Tibetan chars and the counts of spaces and tseks. Only the chunks are handled in Python.
+
+    NumPy is an optional dependency: ``pip install botok[numpy]``
+    """
+
+    def __init__(self, bs):
+        if np is None:
+            raise ImportError(
+                "the numpy chunking engine requires NumPy: pip install botok[numpy]"
+            )
+        super().__init__(bs)
+        cats = np.frombuffer(bytes(bs.base_structure), dtype=np.uint8)
+        self.cats = cats
+
+        # counts of chars before every index, to test a chunk in constant time
+        self.n_spaces = self._cumsum(cats == int(a.TRANSPARENT))
+        self.n_non_skippable = self._cumsum(
+            (cats != int(a.TSEK)) & (cats != int(a.TRANSPARENT))
+        )
+
+        # the chars that are not syllable ends, and the ones that start a syllable after an end
+        is_end = np.isin(cats, [int(cat) for cat in SYL_END])
+        self.non_ends = np.flatnonzero(~is_end)
+        self.syl_starts = np.flatnonzero(~is_end[1:] & is_end[:-1]) + 1
+
+        # 0: OTHER, 1: CJK (and spaces), 2: LATIN, see ``NON_BO_MARKERS``
+        non_bo = np.zeros(len(cats), dtype=np.uint8)
+        non_bo[(cats == int(a.CJK)) | (cats == int(a.TRANSPARENT))] = 1
+        non_bo[cats == int(a.LATIN)] = 2
+        self.non_bo = non_bo
+        self.non_bo_cuts = np.flatnonzero(non_bo[1:] != non_bo[:-1]) + 1
+
+    @staticmethod
+    def _cumsum(mask):
+        counts = np.zeros(len(mask) + 1, dtype=np.int64)
+        np.cumsum(mask, dtype=np.int64, out=counts[1:])
+        return counts
+
+    def iter_class_runs(self, space_as_punct=False):
+        cats = self.cats
+        if not len(cats):
+            return
+        table = np.frombuffer(CLASS_TABLES[space_as_punct], dtype=np.uint8)
+        classes = table[cats]
+        after_punct = np.zeros(len(cats), dtype=bool)
+        after_punct[1:] = (cats[1:] == int(a.TSEK)) & np.isin(
+            cats[:-1], [int(cat) for cat in PUNCT_CONTEXT]
+        )
+        classes[after_punct] = PUNCT
+
+        starts = np.flatnonzero(classes[1:] != classes[:-1]) + 1
+        starts = np.concatenate(([0], starts))
+        ends = np.concatenate((starts[1:], [len(cats)]))
+        for cls, start, end in zip(
+            classes[starts].tolist(), starts.tolist(), ends.tolist()
+        ):
+            yield CLASS_MARKERS[cls], start, end - start
+
+    def is_skippable(self, chunk):
+        start, end = chunk[1], chunk[1] + chunk[2]
+        return self.n_non_skippable[end] == self.n_non_skippable[start]
+
+    def has_space(self, start, end):
+        return self.n_spaces[end] > self.n_spaces[start]
+
+    def split_syllables(self, start, end):
+        # the end-markers starting the chunk are dropped
+        first = self.non_ends[np.searchsorted(self.non_ends, start) :][:1]
+        if not len(first) or first[0] >= end:
+            return []
+        first = int(first[0])
+
+        starts = self.syl_starts
+        inner = starts[
+            np.searchsorted(starts, first, side="right") : np.searchsorted(starts, end)
+        ].tolist()
+        bounds = [first] + inner + [end]
+        return [(u.TEXT.value, s, e - s) for s, e in zip(bounds[:-1], bounds[1:])]
+
+    def split_non_bo(self, start, end):
+        cuts = self.non_bo_cuts
+        inner = cuts[
+            np.searchsorted(cuts, start, side="right") : np.searchsorted(cuts, end)
+        ].tolist()
+        bounds = [start] + inner + [end]
+        return [
+            (NON_BO_MARKERS[int(self.non_bo[s])], s, e - s)
+            for s, e in zip(bounds[:-1], bounds[1:])
+        ]
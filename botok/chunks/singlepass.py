@@ -0,0 +1,259 @@
+# coding: utf-8
+import re
+
+from ..vars import CharMarkers as a
+from ..vars import ChunkMarkers as u
+from ..vars import NO_SHAD_CONS, VOWELS
+
+# classes of chars: the chunks produced by the first chunking passes of ``Chunks.make_chunks()``
+# (bo/non-bo | punct | sym | num) are the runs of chars of the same class
+NON_BO, PUNCT, SYM, NUM, BO, SPACE = b"opsnbw"
+CLASS_MARKERS = {
+    NON_BO: u.OTHER.value,
+    PUNCT: u.PUNCT.value,
+    SYM: u.SYM.value,
+    NUM: u.NUM.value,
+    BO: u.BO.value,
+    SPACE: u.PUNCT.value,
+}
+
+
+def _class_table(space_as_punct):
+    table = bytearray([BO]) * 256
+    for cat in [a.OTHER, a.LATIN, a.CJK]:
+        table[cat] = NON_BO
+    for cat in [a.NORMAL_PUNCT, a.SPECIAL_PUNCT, a.TRANSPARENT]:
+        table[cat] = PUNCT
+    for cat in [a.SYMBOL, a.NFC]:
+        table[cat] = SYM
+    table[a.NUMERAL] = NUM
+    if space_as_punct:
+        table[a.TRANSPARENT] = SPACE
+    return bytes(table)
+
+
+CLASS_TABLES = {False: _class_table(False), True: _class_table(True)}
+# a tsek is a punctuation when it follows any of these
+PUNCT_CONTEXT = [
+    a.SYMBOL,
+    a.NUMERAL,
+    a.OTHER,
+    a.NORMAL_PUNCT,
+    a.SPECIAL_PUNCT,
+    a.TSEK,
+    a.TRANSPARENT,
+]
+TSEK_AFTER_PUNCT = re.compile(
+    b"(?<=[" + re.escape(bytes(PUNCT_CONTEXT)) + b"])" + re.escape(bytes([a.TSEK]))
+)
+RUNS = re.compile(rb"(.)\1*", re.S)
+# the chars ending a syllable
+SYL_END = {a.TSEK, a.SKRT_LONG_VOW}
+
+
+class SinglePassChunker:
+    """
+    Produces the same chunks as the pipeline of ``Chunks.make_chunks()``, in a single left-to-right pass.
+
+    Every pass of the pipeline only depends on the chunks surrounding the one it modifies, so they are
+    chained as generators: each chunk goes through all of them before the next one is read, instead of
+    re-chunking the whole list of chunks at every pass.
+
+    The classes of the chars are computed in bulk from ``BoString.base_structure``, and give the chunks
+    of the first passes directly.
+    """
+
+    def __init__(self, bs):
+        self.bs = bs
+
+    def make_chunks(self, space_as_punct=False):
+        """
+        :return: the chunks, as (chunk-marker, start, length) tuples
+        """
+        chunks = self.iter_class_runs(space_as_punct=space_as_punct)
+        if not space_as_punct:
+            chunks = self.merge_skippable(chunks)
+        chunks = self.syllabify(chunks)
+        if not space_as_punct:
+            # spaces in syllables are only possible when they are not punctuation
+            chunks = self.adjust_syls(chunks)
+        chunks = self.split_other(chunks)
+        if not space_as_punct:
+            chunks = self.merge_skippable(chunks)
+        return list(chunks)
+
+    def iter_class_runs(self, space_as_punct=False):
+        classes = bytearray(self.bs.base_structure.translate(CLASS_TABLES[space_as_punct]))
+        for m in TSEK_AFTER_PUNCT.finditer(self.bs.base_structure):
+            classes[m.start()] = PUNCT
+        for m in RUNS.finditer(classes):
+            yield CLASS_MARKERS[classes[m.start()]], m.start(), m.end() - m.start()
+
+    def is_skippable(self, chunk):
+        structure = self.bs.base_structure
+        return all(
+            structure[i] == a.TSEK or structure[i] == a.TRANSPARENT
+            for i in range(chunk[1], chunk[1] + chunk[2])
+        )
+
+    def merge_skippable(self, chunks):
+        """
+        Merges the chunks made of tseks and spaces into the preceding chunk (the following one for the
+        first chunks), then merges the consecutive non-TEXT chunks of the same type.
+        See ``ChunkFrameworkBase.merge_skippable_punct()``
+        """
+        return self._merge_similar(self._merge_skippable(chunks))
+
+    def _merge_skippable(self, chunks):
+        chunks = iter(chunks)
+        previous = next(chunks, None)
+        if previous is None:
+            return
+        leading = True
+        for current in chunks:
+            if leading:
+                if self.is_skippable(previous):
+                    previous = (current[0], previous[1], current[1] + current[2] - previous[1])
+                    continue
+                leading = False
+            if self.is_skippable(current):
+                previous = (previous[0], previous[1], previous[2] + current[2])
+            else:
+                yield previous
+                previous = current
+        yield previous
+
+    @staticmethod
+    def _merge_similar(chunks):
+        previous = None
+        for current in chunks:
+            if (
+                previous is not None
+                and previous[0] != u.TEXT.value
+                and current[0] != u.TEXT.value
+                and previous[0] == current[0]
+            ):
+                previous = (previous[0], previous[1], previous[2] + current[2])
+            else:
+                if previous is not None:
+                    yield previous
+                previous = current
+        if previous is not None:
+            yield previous
+
+    def syllabify(self, chunks):
+        """Splits the BO chunks into TEXT chunks, see ``ChunkFramework.syllabify()``"""
+        for chunk in chunks:
+            if chunk[0] != u.BO.value:
+                yield chunk
+                continue
+
+            syls = self.split_syllables(chunk[1], chunk[1] + chunk[2])
+            if syls:
+                yield from syls
+            else:
+                yield chunk
+
+    def split_syllables(self, start, end):
+        structure = self.bs.base_structure
+        syls = []
+        i = start
+        # the end-markers starting the chunk are dropped
+        while i < end and structure[i] in SYL_END:
+            i += 1
+        while i < end:
+            syl_start = i
+            while i < end and structure[i] not in SYL_END:
+                i += 1
+            while i < end and structure[i] in SYL_END:
+                i += 1
+            syls.append((u.TEXT.value, syl_start, i - syl_start))
+        return syls
+
+    def adjust_syls(self, chunks):
+        """Splits the TEXT chunks containing spaces, see ``ChunkFramework.adjust_syls()``"""
+        for chunk in chunks:
+            if chunk[0] != u.TEXT.value:
+                yield chunk
+            else:
+                yield from self._adjust_syl(chunk)
+
+    def _adjust_syl(self, chunk):
+        # the chunks produced are adjusted again, except for the first one
+        new = self._split_syl(chunk[1], chunk[1] + chunk[2])
+        if not new:
+            yield chunk
+            return
+        yield u.TEXT.value, new[0][1], new[0][2]
+        for n_chunk in new[1:]:
+            yield from self._adjust_syl((u.TEXT.value, n_chunk[1], n_chunk[2]))
+
+    def has_space(self, start, end):
+        structure = self.bs.base_structure
+        return any(structure[i] == a.TRANSPARENT for i in range(start, end))
+
+    def _split_syl(self, start, end):
+        structure = self.bs.base_structure
+        if not self.has_space(start, end):
+            return []
+
+        # runs of spaces and non-spaces
+        indices = []
+        for i in range(start, end):
+            is_space = structure[i] == a.TRANSPARENT
+            if indices and indices[-1][0] == is_space:
+                indices[-1] = (is_space, indices[-1][1], indices[-1][2] + 1)
+            else:
+                indices.append((is_space, i, 1))
+
+        yes = u.TEXT.value
+        for num, i in enumerate(indices):
+            if len(indices) - 1 > num > 0 and indices[num][0]:
+                _, s, e = indices[num - 1]
+                text = self.bs.string[s : s + e]
+                if (
+                    len(text) >= 2 and text[-1] in VOWELS and text[-2] in NO_SHAD_CONS
+                ) or (len(text) >= 1 and text[-1] in NO_SHAD_CONS):
+                    indices[num - 1] = (yes, s, e + i[2])
+                else:
+                    indices[num - 1] = (
+                        indices[num - 1][0],
+                        s,
+                        e + indices[num][2] + indices[num + 1][2],
+                    )
+                    indices[num + 1] = (None, indices[num + 1][1], indices[num + 1][2])
+            elif indices[num][0] is False:
+                indices[num] = (yes, i[1], i[2])
+            elif (num == 0 or num == len(indices) - 1) and indices[num][0] is True:
+                indices[num] = (u.PUNCT.value, i[1], i[2])
+
+        indices = [i for i in indices if i[0] is not True and i[0] is not None]
+        return indices if len(indices) > 1 else list()
+
+    def split_other(self, chunks):
+        """Splits the non-Tibetan chunks into CJK, LATIN and OTHER chunks"""
+        for chunk in chunks:
+            if chunk[0] != u.OTHER.value:
+                yield chunk
+            else:
+                yield from self.split_non_bo(chunk[1], chunk[1] + chunk[2])
+
+    def split_non_bo(self, start, end):
+        structure = self.bs.base_structure
+        chunks = []
+        run_start, run_marker = start, None
+        for i in range(start, end):
+            # the spaces merged into the chunk go with CJK, like in ``ChunkFramework.chunk_cjk()``
+            if structure[i] == a.CJK or structure[i] == a.TRANSPARENT:
+                marker = u.CJK.value
+            elif structure[i] == a.LATIN:
+                marker = u.LATIN.value
+            else:
+                marker = u.OTHER.value
+            if marker != run_marker:
+                if run_marker is not None:
+                    chunks.append((run_marker, run_start, i - run_start))
+                run_start, run_marker = i, marker
+        if run_marker is not None:
+            chunks.append((run_marker, run_start, end - run_start))
+        return chunks
@@ -33,6 +33,10 @@ class AdjustTokens:
         self.rules = []
         self.parse_rules()
 
+    def changes_boundaries(self):
+        """True if any rule merges or splits tokens, False if they only replace attributes"""
+        return any(rule["operation"] in ["split", "merge"] for rule in self.rules)
+
     def no_token_matched(self, matchcql):
         matched_tokens = [token for token in re.split(r'(\[.+?\])', matchcql) if token != " " and token != ""]
         return len(matched_tokens)
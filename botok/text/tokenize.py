@@ -1,12 +1,11 @@
 # coding: utf-8
-from functools import lru_cache
 from typing import List, NewType, Tuple
 
 from ..tokenizers.chunktokenizer import ChunkTokenizer
 from ..tokenizers.paragraphtokenizer import paragraph_tokenizer
+from ..tokenizers.registry import registry
 from ..tokenizers.sentencetokenizer import sentence_tokenizer
 from ..tokenizers.token import Token
-from ..tokenizers.wordtokenizer import WordTokenizer
 
 BoToken = NewType("BoToken", Token)
 
@@ -35,11 +34,9 @@ def paragraph_tok(text: str, config=None) -> List[Tuple[int, List[BoToken]]]:
     return paragraph_tokenizer(tokens)
 
 
-@lru_cache(
-    maxsize=None
-)  # <--- make sure that the trie is only built once then kept in memory
 def get_wordtokenizer(config=None):
-    return WordTokenizer(config=config)
+    # the tokenizers are kept in memory and shared by all the configs of a same dialect pack
+    return registry.get(config)
 
 
 def chunk_tok(text: str) -> List[str]:
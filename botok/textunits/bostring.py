@@ -1,10 +1,37 @@
 # coding: utf-8
+import re
+import unicodedata
+from collections import Counter
 from warnings import warn
 
-from .charcategories import get_char_category
+from .charcategories import UNKNOWN, get_categories, get_char_category, tibetan
 from ..vars import CharMarkers as a
 from ..vars import char_values
 
+# canonical expansions of the NFC chars that have one
+NFC_EXPANSIONS = {
+    ord(char): unicodedata.normalize("NFD", char)
+    for char, cat in tibetan.items()
+    if cat == a.NFC and unicodedata.normalize("NFD", char) != char
+}
+NFC_CATEGORY = re.compile(re.escape(bytes([a.NFC])))
+
+
+class NfcWarning(UserWarning):
+    """
+    Issued once per ``BoString`` containing non-expanded (NFC) chars.
+
+    :param count: number of NFC chars in the string
+    :param chars: ``Counter`` of the NFC chars
+    :param positions: indices of the first ``BoString.MAX_NFC_POSITIONS`` NFC chars
+    """
+
+    def __init__(self, message, count, chars, positions):
+        super().__init__(message)
+        self.count = count
+        self.chars = chars
+        self.positions = positions
+
 
 class BoString:
     """
@@ -18,8 +45,8 @@ class BoString:
 
         - all the characters in the Unicode Tables for Tibetan are organized in lists
             hard-coded as string variables in ``__attribute_basic_types()``.
-        - upon instanciation, ``__init__().base_structure`` is populated with the indices of every
-            char in the input string(key) and the group constant to which it belongs(values)
+        - upon instanciation, ``__init__().base_structure`` is populated with the group constant
+            of every char of the input string, in a bytearray indexed like the string
         - human-readable description of the group constant can be accessed in ``__init__().char_markers``
 
     :Example:
@@ -30,9 +57,8 @@ class BoString:
     >>> bo_str = ' བཀྲ་ཤིས་  tr བདེ་ལེགས།'
     >>> bs = BoString(bo_str)
 
-    >>> bs.base_structure  # key: character index, value: character group
-    {0: 15, 1: 1, 2: 1, 3: 2, 4: 4, 5: 1, 6: 3, 7: 1, 8: 4, 9: 15, 10: 15, 11: 14,
-    12: 14, 13: 15, 14: 1, 15: 1, 16: 3, 17: 4, 18: 1, 19: 3, 20: 1, 21: 1, 22: 8}
+    >>> list(bs.base_structure)  # index: character index, value: character group
+    [18, 1, 1, 2, 4, 1, 3, 1, 4, 18, 18, 16, 16, 18, 1, 1, 3, 4, 1, 3, 1, 1, 5]
 
     >>> bs.get_categories()
     {0: 'space', 1: 'cons', 2: 'cons', 3: 'sub-cons', 4: 'tsek', 5: 'cons', 6: 'vow',
@@ -45,44 +71,60 @@ class BoString:
                 entries in ``__init__().char_markers``.
     """
 
-    def __init__(self, string, ignore_chars=None):
+    MAX_NFC_POSITIONS = 10
+
+    def __init__(self, string, ignore_chars=None, expand_nfc=False):
+        """
+        :param expand_nfc: if True, the NFC chars that can be are expanded in ``string``
+        """
         if ignore_chars is None:
             ignore_chars = []
+        if expand_nfc:
+            string = string.translate(NFC_EXPANSIONS)
         self.ignore_chars = ignore_chars
         self.string = string
         self.len = len(string)
-        self.base_structure = {}
+        self.base_structure = bytearray()
+        self.nfc = None  # the ``NfcWarning`` issued for the string
         self.__attribute_basic_types()
 
     def __attribute_basic_types(self):
         """
         Populates ``__init__().base_structure``.
         """
-        for i in range(len(self.string)):
-            char = self.string[i]
-            cat = get_char_category(char)
-            self.__nfc_check(cat, i)
-            if char in self.ignore_chars:
-                self.base_structure[
-                    i
-                ] = (
-                    a.TRANSPARENT.value
-                )  # spaces chars are allowed anywhere, thus ignored
-            else:
-                self.base_structure[i] = cat
-
-    def __nfc_check(self, cat, idx):
-        if cat == a.NFC:
-            slice_start = 10
-            slice_end = 10
-            while idx - slice_start < 0:
-                slice_start -= 1
-            while idx + slice_end >= self.len:
-                slice_end -= 1
-            warn(
+        cats = get_categories(self.string)
+        if UNKNOWN in cats:
+            get_char_category(self.string[cats.index(UNKNOWN)])  # raises the ValueError
+        if a.NFC in cats:
+            self.__nfc_check(cats)
+        if self.ignore_chars:
+            # spaces chars are allowed anywhere, thus ignored
+            ignored = {char: a.TRANSPARENT.value for char in self.ignore_chars}
+            cats = bytes(ignored.get(char, cat) for char, cat in zip(self.string, cats))
+        self.base_structure = bytearray(cats)
+
+    def __nfc_check(self, cats):
+        positions = [m.start() for m in NFC_CATEGORY.finditer(cats)]
+        chars = Counter(self.string[i] for i in positions)
+        idx = positions[0]
+        before = min(10, idx)
+        after = min(10, self.len - idx - 1)
+        context = self.string[idx - before : idx + after]
+        if len(positions) == 1:
+            message = (
                 f'Beware of unexpected results: input string contains the non-expanded char "{self.string[idx]}", '
-                f'found in "{self.string[slice_start: slice_end]}".'
+                f'found in "{context}".'
             )
+        else:
+            found = ", ".join(f'"{char}": {n}' for char, n in chars.most_common())
+            message = (
+                f"Beware of unexpected results: input string contains {len(positions)} non-expanded chars "
+                f'({found}), first found in "{context}".'
+            )
+        self.nfc = NfcWarning(
+            message, len(positions), chars, positions[: self.MAX_NFC_POSITIONS]
+        )
+        warn(self.nfc)
 
     def export_groups(self, start_idx, slice_len, for_substring=True):
         """
@@ -108,19 +150,31 @@ class BoString:
         {2: 1, 3: 2, 4: 4, 5: 1, 6: 3}
 
         """
-        if for_substring:
-            return {
-                n: self.base_structure[i]
-                for n, i in enumerate(range(start_idx, start_idx + slice_len))
-            }
-        else:
-            return {
-                i: self.base_structure[i]
-                for i in range(start_idx, start_idx + slice_len)
-            }
+        groups = self.export_view(start_idx, slice_len)
+        offset = 0 if for_substring else start_idx
+        return dict(enumerate(groups, offset))
+
+    def export_view(self, start_idx, slice_len):
+        """
+        Export the base groups for a slice of the input string, without copying them
+
+        :return: a memoryview of the slice of ``__init__().base_structure``, indexed from 0
+
+        :Example:
+
+        >>> bo_str = ' བཀྲ་ཤིས་  tr བདེ་ལེགས།'
+        >>> bs = BoString(bo_str)
+
+        >>> list(bs.export_view(2, 5))
+        [1, 2, 4, 1, 3]
+
+        """
+        return memoryview(self.base_structure)[start_idx : start_idx + slice_len]
 
     def get_categories(self, struct=None):
-        if struct is None or not isinstance(struct, dict):
-            return {k: char_values[v] for k, v in self.base_structure.items()}
-        else:
+        if struct is None:
+            struct = self.base_structure
+        if isinstance(struct, dict):
             return {k: char_values[v] for k, v in struct.items()}
+        else:
+            return dict(enumerate(char_values[v] for v in struct))
@@ -38,34 +38,79 @@ transparent = [
 ]
 
 
+# category of every Tibetan char
+tibetan = {char: cat for cat, chars in categories.items() for char in chars}
+
+# source for codepoints: https://jrgraphix.net/research/unicode.php
+tibetan_range = ("\u0f00", "\u0fff")
+cjk_ranges = [("\u2e80", "\ufaff"), ("\ufe30", "\ufe4f"), ("\u20000", "\u2fa1f")]
+# 1. 0020 - 036f:  Latin Basic + Latin-1 Supplement + Latin Extended-A + Latin Extended-B
+# IPA Extensions + Spacing Modifier Letters + Combining Diacritical Marks
+# 2. 1e00 - 20cf: Latin Extended Additional + Superscripts and Subscripts + Currency Symbols
+latin_ranges = [("\u0020", "\u036f"), ("\u1e00", "\u20cf")]
+
+
 def get_char_category(char):
-    # source for codepoints: https://jrgraphix.net/research/unicode.php
     if char in transparent:
         return c.TRANSPARENT.value
 
-    # Tibetan range
-    if "\u0f00" <= char <= "\u0fff":
-        for cat, chars in categories.items():
-            if char in chars:
-                return cat
+    if tibetan_range[0] <= char <= tibetan_range[1]:
+        if char in tibetan:
+            return tibetan[char]
         raise ValueError(
             f'The char "{char}" is expected to be in the tibetan table, but is not.'
         )
 
-    # CJK range
-    elif (
-        "\u2e80" <= char <= "\ufaff"
-        or "\ufe30" <= char <= "\ufe4f"
-        or eval('"\u20000"') <= char <= eval('"\u2fa1f"')
-    ):
+    elif any(start <= char <= end for start, end in cjk_ranges):
         return c.CJK.value
 
-    # LATIN range
-    # 1. 0020 - 036f:  Latin Basic + Latin-1 Supplement + Latin Extended-A + Latin Extended-B
-    # IPA Extensions + Spacing Modifier Letters + Combining Diacritical Marks
-    # 2. 1e00 - 20cf: Latin Extended Additional + Superscripts and Subscripts + Currency Symbols
-    elif "\u0020" <= char <= "\u036f" or "\u1e00" <= char <= "\u20cf":
+    elif any(start <= char <= end for start, end in latin_ranges):
         return c.LATIN.value
 
     else:
         return c.OTHER.value
+
+
+# the category of the chars of the Tibetan range that are missing from the table
+UNKNOWN = 0
+
+
+def _bmp_slice(start, end):
+    # the BMP chars between start and end, compared as strings like in get_char_category()
+    first = ord(start[0]) if len(start) == 1 else ord(start[0]) + 1
+    return slice(min(first, 0x10000), min(ord(end[0]), 0xFFFF) + 1)
+
+
+def _build_table():
+    # the categories are written from the lowest to the highest precedence in get_char_category()
+    table = bytearray([c.OTHER.value]) * 0x10000
+    for cat, ranges in [(c.LATIN.value, latin_ranges), (c.CJK.value, cjk_ranges)]:
+        for start, end in ranges:
+            s = _bmp_slice(start, end)
+            table[s] = bytes([cat]) * len(range(0x10000)[s])
+    s = _bmp_slice(*tibetan_range)
+    table[s] = bytes([UNKNOWN]) * len(range(0x10000)[s])
+    for char, cat in tibetan.items():
+        table[ord(char)] = cat
+    for char in transparent:
+        table[ord(char)] = c.TRANSPARENT.value
+    return bytes(table)
+
+
+# the category of every char of the BMP, indexed by codepoint. The chars above U+FFFF are all OTHER.
+CATEGORY_TABLE = _build_table()
+
+
+def get_categories(string):
+    """
+    Categorizes all the chars of a string at once.
+
+    :return: the categories of the chars (see ``get_char_category()``), as bytes.
+             The chars of the Tibetan range missing from the table are ``UNKNOWN``.
+    """
+    # translate() replaces every char by chr(category), except the ones above U+FFFF
+    cats = string.translate(CATEGORY_TABLE)
+    try:
+        return cats.encode("latin-1")
+    except UnicodeEncodeError:
+        return bytes(ord(cat) if ord(cat) <= 0xFF else c.OTHER.value for cat in cats)
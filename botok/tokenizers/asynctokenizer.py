@@ -0,0 +1,197 @@
+# coding: utf-8
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from .batch import _tokenize_each, catch_each, make_pool
+from .wordtokenizer import WordTokenizer
+
+
+class AsyncWordTokenizer:
+    """
+    Wraps a ``WordTokenizer`` for asyncio: the strings are tokenized in an executor, so the event loop
+    is not blocked.
+
+    - batching: the requests made within ``batch_delay`` seconds are sent to the executor together, up
+      to ``batch_size`` strings or ``max_batch_chars`` chars. A long string is thus sent at once.
+    - backpressure: at most ``max_pending`` requests are processed, the following ones wait for them.
+    - cancellation: a cancelled request is removed from its batch if the batch was not sent yet.
+      Otherwise, the batch is completed and the result of the request dropped.
+    - errors: a string raising an exception only fails its own request, not the rest of its batch.
+      When a process of the "process" executor dies, the batches it was running fail with a
+      ``BrokenProcessPool`` and the pool is replaced for the following requests.
+
+    The threads of the "thread" executor share ``tokenizer`` (see ``Tokenize.tokenize()``). The
+    processes of the "process" executor inherit it when they are forked. Otherwise, every process
+    loads the trie saved on disk (see ``batch.make_pool()``): use the "mmap" backend of Trie to share
+    its memory.
+    """
+
+    def __init__(
+        self,
+        tokenizer=None,
+        executor="thread",
+        workers=None,
+        max_pending=64,
+        batch_size=16,
+        max_batch_chars=10000,
+        batch_delay=0.002,
+        mp_context=None,
+    ):
+        """
+        :param tokenizer: a WordTokenizer, one with the default config if None
+        :param executor: "thread" or "process". Threads keep the event loop responsive, processes
+                         also tokenize in parallel.
+        :param workers: number of threads or processes, ``os.cpu_count()`` if None
+        :param max_pending: maximum number of requests being processed at once
+        :param batch_size: maximum number of strings in a batch
+        :param max_batch_chars: a batch is sent as soon as its strings have this many chars
+        :param batch_delay: seconds a batch waits for other requests before being sent
+        :param mp_context: start method of the "process" executor, see ``WordTokenizer.tokenize_many()``
+        """
+        if executor not in ["thread", "process"]:
+            raise ValueError('executor should be "thread" or "process"')
+        if max_pending < 1 or batch_size < 1:
+            raise ValueError("max_pending and batch_size should be at least 1")
+
+        self.tokenizer = tokenizer if tokenizer is not None else WordTokenizer()
+        self.executor_type = executor
+        self.workers = workers or os.cpu_count() or 1
+        self.mp_context = mp_context
+        if executor == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            self.executor = make_pool(self.tokenizer, self.workers, mp_context)
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_batch_chars = max_batch_chars
+        self.batch_delay = batch_delay
+
+        self._semaphore = None  # created in the event loop, see ``_submit()``
+        self._batches = {}  # (method, kwargs): [[(string, future), ...], chars, timer]
+        self._running = set()
+        self._closed = False
+
+    async def tokenize(self, string, split_affixes=True, spaces_as_punct=False):
+        """See ``WordTokenizer.tokenize()``"""
+        return await self._submit(
+            "tokenize", string, split_affixes=split_affixes, spaces_as_punct=spaces_as_punct
+        )
+
+    async def tokenize_columnar(self, string, split_affixes=True, spaces_as_punct=False):
+        """See ``WordTokenizer.tokenize_columnar()``"""
+        return await self._submit(
+            "tokenize_columnar",
+            string,
+            split_affixes=split_affixes,
+            spaces_as_punct=spaces_as_punct,
+        )
+
+    async def segment(self, string, split_affixes=True, spaces_as_punct=False):
+        """See ``WordTokenizer.segment()``"""
+        return await self._submit(
+            "segment", string, split_affixes=split_affixes, spaces_as_punct=spaces_as_punct
+        )
+
+    async def close(self):
+        """Sends the batches waiting, waits for all the requests and shuts the executor down."""
+        self._closed = True
+        for key in list(self._batches):
+            self._flush(key)
+        if self._running:
+            await asyncio.wait(set(self._running))
+        self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _submit(self, method, string, **kwargs):
+        if self._closed:
+            raise RuntimeError("the AsyncWordTokenizer is closed")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            key = (method, tuple(sorted(kwargs.items())))
+            batch = self._batches.get(key)
+            if batch is None:
+                timer = loop.call_later(self.batch_delay, self._flush, key)
+                batch = self._batches[key] = [[], 0, timer]
+            batch[0].append((string, future))
+            batch[1] += len(string)
+            if len(batch[0]) >= self.batch_size or batch[1] >= self.max_batch_chars:
+                self._flush(key)
+            # cancelling the request cancels the future
+            return await future
+
+    def _flush(self, key):
+        """Sends the batch of ``key`` to the executor"""
+        if key not in self._batches:
+            return
+        requests, _, timer = self._batches.pop(key)
+        timer.cancel()
+        requests = [(string, future) for string, future in requests if not future.done()]
+        if not requests:
+            return
+
+        method, kwargs = key[0], dict(key[1])
+        strings = [string for string, _ in requests]
+        if self.executor_type == "thread":
+            job = partial(self._tokenize_batch, strings, method, kwargs)
+        else:
+            job = partial(_tokenize_each, strings, method, kwargs)
+        executor = self.executor
+        loop = asyncio.get_running_loop()
+        try:
+            try:
+                running = loop.run_in_executor(executor, job)
+            except BrokenProcessPool:
+                # the pool broke before the results of its last batches were set
+                executor = self._replace_executor(executor)
+                running = loop.run_in_executor(executor, job)
+        except Exception as e:
+            # raised in a timer callback, the exception would not reach the requests
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self._running.add(running)
+        running.add_done_callback(partial(self._set_results, requests, executor))
+
+    def _replace_executor(self, broken):
+        """Replaces the process pool ``broken`` by a new one, unless it was already replaced"""
+        if self.executor is broken:
+            broken.shutdown(wait=False)
+            self.executor = make_pool(self.tokenizer, self.workers, self.mp_context)
+        return self.executor
+
+    def _set_results(self, requests, executor, running):
+        self._running.discard(running)
+        if running.cancelled():
+            for _, future in requests:
+                future.cancel()
+            return
+
+        # the executor failed (a process crashed, etc.): all the requests fail
+        error = running.exception()
+        if isinstance(error, BrokenProcessPool) and not self._closed:
+            self._replace_executor(executor)
+        results = running.result() if error is None else [(None, error)] * len(requests)
+        # otherwise, every request gets its own result or exception
+        for (_, future), (result, exception) in zip(requests, results):
+            if future.done():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+    def _tokenize_batch(self, strings, method, kwargs):
+        return catch_each(getattr(self.tokenizer, method), strings, kwargs)
@@ -0,0 +1,164 @@
+# coding: utf-8
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+# the WordTokenizer of a worker process, see ``_init_worker()``
+_worker_tokenizer = None
+
+
+def _init_worker(tokenizer=None, params=None):
+    """
+    Runs once in every worker. With fork, the tokenizer of the parent process is inherited, trie
+    included. Otherwise, the worker creates its own from the params of the tokenizer: its trie is then
+    loaded from the file saved by the parent (shared by all the workers with the "mmap" backend).
+    """
+    global _worker_tokenizer
+    if tokenizer is None:
+        from .wordtokenizer import WordTokenizer
+
+        tokenizer = WordTokenizer(**params)
+    _worker_tokenizer = tokenizer
+
+
+def _tokenize_batch(strings, method, kwargs):
+    tokenize = getattr(_worker_tokenizer, method)
+    return [tokenize(string, **kwargs) for string in strings]
+
+
+def _tokenize_each(strings, method, kwargs):
+    """Same as ``_tokenize_batch()``, see ``catch_each()``"""
+    return catch_each(getattr(_worker_tokenizer, method), strings, kwargs)
+
+
+def catch_each(tokenize, strings, kwargs):
+    """
+    :return: a (result, exception) pair for every string, so a string raising an exception doesn't
+             fail the others
+    """
+    results = []
+    for string in strings:
+        try:
+            results.append((tokenize(string, **kwargs), None))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
+
+def make_pool(tokenizer, workers, mp_context=None):
+    """
+    A ProcessPoolExecutor whose workers tokenize with ``tokenizer``, see ``_init_worker()``
+
+    :param mp_context: a multiprocessing context or the name of a start method ("fork", "spawn" or
+                       "forkserver"). The default start method of the platform if None.
+    """
+    if mp_context is None or isinstance(mp_context, str):
+        mp_context = multiprocessing.get_context(mp_context)
+    if mp_context.get_start_method() == "fork":
+        initargs = (tokenizer,)
+    else:
+        if tokenizer.tok.trie.deltas:
+            raise ValueError(
+                "the changes made by apply_delta() are not seen by workers that are not forked: "
+                'use mp_context="fork" or add the changes to the dictionary files'
+            )
+        params = {
+            "config": tokenizer.config,
+            "ignore_chars": tokenizer.ignore_chars,
+            "trie_backend": tokenizer.tok.trie.backend,
+            "chunk_engine": tokenizer.chunk_engine,
+        }
+        initargs = (None, params)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=initargs,
+    )
+
+
+def tokenize_many(
+    tokenizer,
+    strings,
+    workers=None,
+    chunksize=16,
+    method="tokenize",
+    max_retries=2,
+    mp_context=None,
+    **kwargs,
+):
+    """
+    Tokenizes the strings in a pool of processes, see ``WordTokenizer.tokenize_many()``.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize < 1:
+        raise ValueError("chunksize should be at least 1")
+
+    strings = iter(strings)
+    if workers <= 1:
+        tokenize = getattr(tokenizer, method)
+        for string in strings:
+            yield tokenize(string, **kwargs)
+        return
+
+    def new_pool():
+        return make_pool(tokenizer, workers, mp_context)
+
+    # the batches: [index of their first string, strings, future, number of crashes].
+    # Only a few batches per worker are read in advance, and the results are yielded in order.
+    pending = deque()
+    max_pending = 2 * workers
+    pool = new_pool()
+    try:
+        n_read = 0
+        while True:
+            isolating = any(p[2] is None for p in pending)
+            while not isolating and len(pending) < max_pending:
+                batch = list(islice(strings, chunksize))
+                if not batch:
+                    break
+                future = pool.submit(_tokenize_batch, batch, method, kwargs)
+                pending.append([n_read, batch, future, 0])
+                n_read += len(batch)
+            if not pending:
+                return
+
+            first = pending[0]
+            if first[2] is None:
+                # after a crash, the batches that were not completed run one at a time, so the one
+                # crashing the worker is known
+                first[2] = pool.submit(_tokenize_batch, first[1], method, kwargs)
+            try:
+                results = first[2].result()
+            except BrokenProcessPool:
+                failed = [
+                    p
+                    for p in pending
+                    if p[2] is not None
+                    and not (p[2].done() and p[2].exception() is None)
+                ]
+                if len(failed) == 1:
+                    failed[0][3] += 1
+                    if failed[0][3] > max_retries:
+                        start, batch = failed[0][:2]
+                        raise RuntimeError(
+                            f"a worker crashed {failed[0][3]} times while tokenizing the strings "
+                            f"{start} to {start + len(batch) - 1}"
+                        )
+                for p in failed:
+                    p[2] = None
+                pool.shutdown(wait=False)
+                pool = new_pool()
+                continue
+
+            pending.popleft()
+            yield from results
+    finally:
+        for p in pending:
+            if p[2] is not None:
+                p[2].cancel()
+        pool.shutdown(wait=True)
@@ -0,0 +1,355 @@
+# coding: utf-8
+from array import array
+from copy import deepcopy
+
+from .token import is_sanskrit
+from .tokenize import Tokenize
+from ..vars import AA, DAGDRA, TSEK
+from ..vars import ChunkMarkers as c
+
+# the bits of ``TokenColumns.flags``
+AFFIX = 1
+AFFIX_HOST = 2
+SKRT = 4
+MERGED_DAGDRA = 8
+
+
+class TokenColumns:
+    """
+    The tokens of a string, as parallel arrays: the token i is made of starts[i], lengths[i], etc.
+
+    - starts, lengths: the substring of the token in ``string``
+    - chunk_types: the chunk-marker of the token (see ``ChunkMarkers``)
+    - pos_ids, lemma_ids: indices in ``pos_names`` and ``lemmas``, where every distinct value is kept once
+    - flags: AFFIX, AFFIX_HOST, SKRT and MERGED_DAGDRA bits, like the attributes of ``Token``
+    """
+
+    def __init__(self, string):
+        self.string = string
+        self.starts = array("q")
+        self.lengths = array("q")
+        self.chunk_types = array("B")
+        self.pos_ids = array("l")
+        self.lemma_ids = array("l")
+        self.flags = array("B")
+        self.pos_names = []
+        self.lemmas = []
+        self._pos_known = {}
+        self._lemmas_known = {}
+
+    def append(self, chunk_type, start, length, pos, lemma, flags):
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.chunk_types.append(chunk_type)
+        self.pos_ids.append(self._intern(pos, self.pos_names, self._pos_known))
+        self.lemma_ids.append(self._intern(lemma, self.lemmas, self._lemmas_known))
+        self.flags.append(flags)
+
+    @staticmethod
+    def _intern(value, values, known):
+        idx = known.get(value)
+        if idx is None:
+            idx = known[value] = len(values)
+            values.append(value)
+        return idx
+
+    def get_text(self, i):
+        return self.string[self.starts[i] : self.starts[i] + self.lengths[i]]
+
+    def get_pos(self, i):
+        return self.pos_names[self.pos_ids[i]]
+
+    def get_lemma(self, i):
+        return self.lemmas[self.lemma_ids[i]]
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class RecordTokenize(Tokenize):
+    """
+    ``Tokenize`` producing (chunk-marker, start, length, chunk indices, data) tuples instead of Tokens
+    """
+
+    def create_token(self, ttype, start, length, syls, data):
+        return ttype, start, length, syls, data
+
+
+class Row:
+    """
+    The attributes of a ``Token`` used by the post-processing of ``WordTokenizer.tokenize()``.
+    The syllables are kept as the strings of the cleaned syllables.
+    """
+
+    __slots__ = (
+        "chunk_type",
+        "start",
+        "len",
+        "syls",
+        "senses",
+        "affixation",
+        "affix",
+        "affix_host",
+        "skrt",
+        "span",
+        "pos",
+        "lemma",
+        "has_merged_dagdra",
+    )
+
+    def __init__(self, chunk_type, start, length, syls, data):
+        self.chunk_type = chunk_type
+        self.start = start
+        self.len = length
+        self.syls = syls
+        self.senses = data.get("senses")
+        self.affixation = data.get("affixation", {})
+        self.affix = False
+        self.affix_host = False
+        # None until computed from span, the substring of the token produced by Tokenize
+        self.skrt = True if data.get("skrt") else None
+        self.span = (start, length)
+        self.pos = ""
+        self.lemma = ""
+        self.has_merged_dagdra = None
+
+    def copy(self):
+        row = Row.__new__(Row)
+        for attr in self.__slots__:
+            setattr(row, attr, getattr(self, attr))
+        row.syls = list(self.syls) if self.syls is not None else None
+        row.senses = deepcopy(self.senses)
+        row.affixation = deepcopy(self.affixation)
+        return row
+
+    @property
+    def text_cleaned(self):
+        """See ``Token.text_cleaned``"""
+        if self.syls:
+            cleaned = TSEK.join(self.syls)
+            if self.affix_host and not self.affix:
+                return cleaned
+            else:
+                return cleaned + TSEK
+        else:
+            return ""
+
+    @property
+    def text_unaffixed(self):
+        """See ``Token.text_unaffixed``"""
+        unaffixed = TSEK.join(self.syls) if self.syls else ""
+        if (
+            self.affixation
+            and not self.affix
+            and "len" in self.affixation
+            and len([True for m in self.senses if "affixed" in m and m["affixed"]]) > 0
+        ):
+            unaffixed = unaffixed[: -self.affixation["len"]]
+
+            if unaffixed and "aa" in self.affixation and self.affixation["aa"]:
+                unaffixed += AA
+
+        if self.affixation and self.affix_host and not self.affix:
+            return unaffixed
+        elif unaffixed:
+            return unaffixed + TSEK
+        else:
+            return ""
+
+
+class ColumnarPipeline:
+    """
+    Runs the post-processing of ``WordTokenizer.tokenize()`` on the output of ``RecordTokenize``,
+    without creating Tokens: ``split_affixed()``, ``WordTokenizer._get_default_lemma()``,
+    ``WordTokenizer._choose_default_entry()`` and ``MergeDagdra``.
+    ``segment()`` only runs the steps that change the boundaries of the tokens.
+    """
+
+    def __init__(self, part_lemmas):
+        self.part_lemmas = part_lemmas
+
+    def run(self, pre_processed, records, split_affixes=True):
+        """
+        :param pre_processed: the TokChunks given to ``RecordTokenize.tokenize()``
+        :param records: what it returned
+        :return: TokenColumns
+        """
+        rows = self.get_rows(pre_processed, records, split_affixes=split_affixes)
+        for row in rows:
+            self.set_default_lemma(row)
+            self.choose_default_entry(row)
+        rows = self.merge_dagdra(rows)
+
+        bs = pre_processed.bs
+        columns = TokenColumns(bs.string)
+        for row in rows:
+            if row.skrt is None:
+                start, length = row.span
+                row.skrt = is_sanskrit(
+                    bs.export_view(start, length), bs.string[start : start + length]
+                )
+            flags = (
+                (AFFIX if row.affix else 0)
+                | (AFFIX_HOST if row.affix_host else 0)
+                | (SKRT if row.skrt else 0)
+                | (MERGED_DAGDRA if row.has_merged_dagdra else 0)
+            )
+            columns.append(row.chunk_type, row.start, row.len, row.pos, row.lemma, flags)
+        return columns
+
+    def segment(self, pre_processed, records, split_affixes=True):
+        """
+        Only splits the affixed particles and merges the dagdras, the steps changing the boundaries.
+
+        :return: the (start, end) of every token
+        """
+        rows = self.get_rows(pre_processed, records, split_affixes=split_affixes)
+        return [(row.start, row.start + row.len) for row in self.merge_dagdra(rows)]
+
+    def get_rows(self, pre_processed, records, split_affixes=True):
+        rows = []
+        for ttype, start, length, syls, data in records:
+            if len(syls) == 1 and pre_processed.syl_ids[syls[0]] is None:
+                syl_texts = None
+            else:
+                syl_texts = [pre_processed.vocab[pre_processed.syl_ids[i]] for i in syls]
+            row = Row(ttype, start, length, syl_texts, data)
+            if split_affixes and self.is_affixed(row):
+                rows.extend(self.split_affixed(row, pre_processed, syls[-1]))
+            else:
+                rows.append(row)
+        return rows
+
+    @staticmethod
+    def is_affixed(row):
+        """See ``split_affixed()``"""
+        return row.affixation and not [
+            True for m in row.senses if "affixed" in m and not m["affixed"]
+        ]
+
+    @staticmethod
+    def split_affixed(row, pre_processed, last_chunk):
+        """Splits the affixed particle from its host, see ``split_affixed()`` and ``TokenSplit``"""
+        affix_len = row.affixation["len"]
+        split_idx = pre_processed.syl_chars[
+            pre_processed.syl_offsets[last_chunk + 1] - affix_len
+        ]
+        split_idx -= row.start
+
+        host, affix = row.copy(), row.copy()
+        last = row.syls[-1]
+        host.syls = row.syls[:-1] + ([last[:-affix_len]] if last[:-affix_len] else [])
+        affix.syls = [last[-affix_len:]]
+        host.len = split_idx
+        affix.len = row.len - split_idx
+        affix.start = row.start + split_idx
+        host.affixation.pop("len", "")
+        host.affixation.pop("type", "")
+        affix.affixation.pop("aa", "")
+
+        host.affix_host = True
+        affix.pos = "PART"
+        affix.affix = True
+        affix.skrt = False
+        affix.senses = []
+        return host, affix
+
+    def set_default_lemma(self, row):
+        """See ``WordTokenizer._get_default_lemma()``"""
+        text_unaffixed = row.text_unaffixed
+        if not text_unaffixed:
+            return
+
+        if row.affix and not row.affix_host:
+            part = "".join(row.syls)
+            lemma = self.part_lemmas[part] if part in self.part_lemmas else part
+            lemma += TSEK
+        elif not row.affix and row.affix_host:
+            lemma = (
+                text_unaffixed + AA + TSEK
+                if row.affixation["aa"]
+                else text_unaffixed + TSEK
+            )
+        else:
+            lemma = (
+                text_unaffixed if text_unaffixed.endswith(TSEK) else text_unaffixed + TSEK
+            )
+
+        for m in row.senses:
+            if "lemma" not in m and ("pos" in m and m["pos"] != "NON_WORD"):
+                m["lemma"] = lemma
+        if not row.senses:
+            row.senses.append({"lemma": lemma})
+
+    @staticmethod
+    def choose_default_entry(row):
+        """See ``WordTokenizer._choose_default_entry()``. Only pos and lemma are kept."""
+        if not row.senses:
+            return
+
+        affixed, non_affixed, no = [], [], []
+        for m in row.senses:
+            if "affixed" in m:
+                if m["affixed"]:
+                    affixed.append(m)
+                else:
+                    non_affixed.append(m)
+            else:
+                no.append(m)
+        senses = non_affixed or no or affixed
+        chosen = sorted(senses, key=len, reverse=True)[0]
+        if "pos" in chosen:
+            row.pos = chosen["pos"]
+        if "lemma" in chosen:
+            row.lemma = chosen["lemma"]
+
+    def merge_dagdra(self, rows):
+        """See ``MergeDagdra.merge()``"""
+        if len(rows) == 2:
+            if rows[1].text_cleaned in DAGDRA:
+                return [self.merge_rows(rows[0], rows[1])]
+            return rows
+
+        merged = []
+        t = 0
+        while t < len(rows):
+            row0 = rows[t]
+            if t + 1 < len(rows):
+                row1 = rows[t + 1]
+                clean_word = row1.text_cleaned
+                if not clean_word.endswith(TSEK):
+                    clean_word += TSEK
+                if (
+                    row0.chunk_type == c.TEXT.value
+                    and row1.chunk_type == c.TEXT.value
+                    and clean_word in DAGDRA
+                ):
+                    row0 = self.merge_rows(row0, row1)
+                    # the merged token is not merged with the following one
+                    t += 1
+            merged.append(row0)
+            t += 1
+        return merged
+
+    @staticmethod
+    def merge_rows(row0, row1):
+        """See ``TokenMerge`` and ``MergeDagdra.merge_with_previous_token()``"""
+        syls = list(row0.syls) if row0.syls else []
+        first_syl = True
+        for syl in row1.syls or []:
+            if syl:
+                if (
+                    first_syl
+                    and (row0.affix_host and not row0.affix)
+                    and (not row1.affix_host and row1.affix)
+                ):
+                    syls[-1] += syl
+                    row0.affix = True
+                    first_syl = False
+                else:
+                    syls.append(syl)
+        row0.syls = syls
+        row0.len += row1.len
+        row0.has_merged_dagdra = True
+        row0.lemma = row0.text_cleaned
+        return row0
@@ -0,0 +1,173 @@
+# coding: utf-8
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from ..config import Config
+from ..tries.manifest import TrieManifest
+from .wordtokenizer import WordTokenizer
+
+
+class TokenizerRegistry:
+    """
+    Process-wide cache of ``WordTokenizer`` instances.
+
+    Tokenizers are keyed by the identity of their dialect pack: its path and the hash of the content of
+    its dictionary and adjustment files. Equal ``Config`` objects thus share the same tokenizer, even when
+    they are created anew for every request.
+    The tokenizers of a dictionary with different adjustments share its trie (see ``Trie``, ``base``).
+
+    ``acquire()`` and ``release()`` count the references to a tokenizer. ``evict()`` drops the tokenizers
+    that are not referenced anymore, so their memory can be reclaimed. When the files of a dialect pack
+    are modified, the tokenizer of their previous content is dropped as well if it is not referenced.
+
+    Tokenizers are created outside of the lock: only the requests for the same dictionary wait for it.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        :param kwargs: passed to every ``WordTokenizer`` created by the registry
+        """
+        self.kwargs = kwargs
+        self.entries = {}  # key: [tokenizer, references]
+        self.bases = {}  # key of a dictionary: tokenizer whose trie is shared
+        self.hashes = {}  # path of a file: (size, mtime, sha256 of the content)
+        self.latest = {}  # (path of the dialect pack, paths of its files): key of their last content
+        self.building = {}  # key of a dictionary: Event set once its tokenizer is created
+        self.lock = threading.RLock()
+
+    def get(self, config=None):
+        """Returns the tokenizer of ``config``, without taking a reference to it."""
+        return self._get_entry(config)[0]
+
+    def acquire(self, config=None):
+        """Returns the tokenizer of ``config`` and takes a reference to it."""
+        return self._get_entry(config, references=1)[0]
+
+    def release(self, tokenizer):
+        """Releases a reference taken with ``acquire()``."""
+        with self.lock:
+            for entry in self.entries.values():
+                if entry[0] is tokenizer:
+                    if entry[1] <= 0:
+                        raise ValueError("the tokenizer was not acquired")
+                    entry[1] -= 1
+                    return
+            raise ValueError("the tokenizer is not in the registry")
+
+    def evict(self, config=None, force=False):
+        """
+        Drops the tokenizers that are not referenced.
+
+        :param config: only drops the tokenizer of this config
+        :param force: also drops the tokenizers that are referenced
+        :return: the number of tokenizers dropped
+        """
+        with self.lock:
+            if config is not None:
+                keys = [self.get_key(config)]
+            else:
+                keys = list(self.entries)
+            return sum(self._evict_key(key, force) for key in keys)
+
+    def references(self, config=None):
+        with self.lock:
+            entry = self.entries.get(self.get_key(config))
+            return entry[1] if entry else 0
+
+    def get_key(self, config=None):
+        """
+        :return: (path of the dialect pack, hash of the dictionary, hash of the adjustments)
+        """
+        if config is None:
+            config = Config()
+        return (
+            str(Path(config.dialect_pack_path).resolve()),
+            self._hash_files(config.dictionary),
+            self._hash_files(config.adjustments),
+        )
+
+    def _get_entry(self, config, references=0):
+        if config is None:
+            config = Config()
+        key = self.get_key(config)
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    entry[1] += references
+                    return entry
+                building = self.building.get(key[:2])
+                if building is None:
+                    building = self.building[key[:2]] = threading.Event()
+                    base = self.bases.get(key[:2])
+                    break
+            # another tokenizer of the dictionary is being created: its trie can then be shared
+            building.wait()
+
+        tokenizer = None
+        try:
+            if base is None:
+                tokenizer = WordTokenizer(config=config, trie_overlay=True, **self.kwargs)
+            else:
+                tokenizer = WordTokenizer(config=config, base=base, **self.kwargs)
+        finally:
+            with self.lock:
+                del self.building[key[:2]]
+                if tokenizer is not None:
+                    self.bases.setdefault(key[:2], base if base is not None else tokenizer)
+                    entry = self.entries[key] = [tokenizer, references]
+                    self._drop_superseded(config, key)
+            building.set()
+        return entry
+
+    def _drop_superseded(self, config, key):
+        """Drops the tokenizer of the previous content of the files of ``config``, if not referenced"""
+        files = tuple(
+            (category, str(path))
+            for component in [config.dictionary, config.adjustments]
+            for category in sorted(component)
+            for path in component[category]
+        )
+        previous = self.latest.get((key[0], files))
+        self.latest[(key[0], files)] = key
+        if previous is not None and previous != key:
+            self._evict_key(previous)
+
+    def _evict_key(self, key, force=False):
+        entry = self.entries.get(key)
+        if entry is None or not (force or entry[1] == 0):
+            return False
+        del self.entries[key]
+        # the trie of a dictionary is kept as long as a tokenizer uses it
+        if not any(k[:2] == key[:2] for k in self.entries):
+            self.bases.pop(key[:2], None)
+        return True
+
+    def _hash_files(self, files):
+        h = hashlib.sha256()
+        for category in sorted(files):
+            for path in files[category]:
+                h.update(f"{category}\t{path}\t{self._hash_file(path)}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def _hash_file(self, path):
+        # files are only hashed again when they are modified
+        stat = os.stat(path)
+        cached = self.hashes.get(str(path))
+        if cached is None or cached[:2] != (stat.st_size, stat.st_mtime_ns):
+            cached = (stat.st_size, stat.st_mtime_ns, TrieManifest.hash_file(path))
+            self.hashes[str(path)] = cached
+        return cached[2]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, config):
+        with self.lock:
+            return self.get_key(config) in self.entries
+
+
+# the registry used by the functions of ``botok.text.tokenize``
+registry = TokenizerRegistry()
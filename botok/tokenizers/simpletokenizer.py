@@ -39,10 +39,8 @@ class SimpleTokenizer:
                 token.syls_start_end = [{"start": 0, "end": length}]
             
             # Populate char_types as expected by Token
-            char_groups = tok_chunks.bs.export_groups(
-                start, length, for_substring=True
-            )
-            token.char_types = [char_values[char_groups[idx]] for idx in sorted(char_groups.keys())]
+            char_groups = tok_chunks.bs.export_view(start, length)
+            token.char_types = [char_values[group] for group in char_groups]
             
             tokens.append(token)
             
@@ -1,19 +1,69 @@
 # coding: utf-8
+from copy import deepcopy
+
+from ..third_party.has_skrt_syl import has_skrt_syl
 from ..vars import TSEK, AA
+from ..vars import CharMarkers as a
+from ..vars import char_values
+
+SKRT_GROUPS = {a.SKRT_VOW, a.SKRT_CONS, a.SKRT_SUB_CONS}
+# the value of the lazy attributes of a Token until they are computed or set.
+# Ellipsis is kept as is by deepcopy() and pickle.
+UNSET = ...
+
+
+def is_sanskrit(char_groups, word):
+    """
+    :param char_groups: the group of every char of ``word``, see ``BoString.base_structure``
+    """
+    if isinstance(char_groups, dict):
+        char_groups = char_groups.values()
+    return not SKRT_GROUPS.isdisjoint(char_groups) or has_skrt_syl(word)
 
 
 class Token:
+    """
+    The attributes are slots. ``char_types``, ``syls_idx``, ``syls_start_end`` and ``skrt`` are computed
+    on first access from the ``TokChunks`` the token was created from (see ``Tokenize.create_token()``),
+    unless they were set before.
+
+    Until then, the token keeps a reference to the ``TokChunks``, and thus to the whole document: keeping
+    a few tokens of a large document keeps all of it in memory. The reference is dropped once the four
+    attributes are computed or set, and is not pickled.
+    """
+
+    __slots__ = (
+        "text",
+        "has_merged_dagdra",
+        "lemma",
+        "sense",
+        "chunk_type",
+        "start",
+        "len",
+        "pos",
+        "affixation",
+        "senses",
+        "affix",
+        "affix_host",
+        "form_freq",
+        "freq",
+        "_",
+        "_char_types",
+        "_syls_idx",
+        "_syls_start_end",
+        "_skrt",
+        "_source",
+    )
+    LAZY = ["char_types", "syls_idx", "syls_start_end", "skrt"]
+
     def __init__(self):
         self.text = ""
-        self.char_types = []
         self.has_merged_dagdra = None
         self.lemma = ""
         self.sense = ""
         self.chunk_type = None
         self.start = 0
         self.len = None
-        self.syls_idx = None
-        self.syls_start_end = None
         self.pos = ""
         self.affixation = {}
         self.senses = None
@@ -21,9 +71,16 @@ class Token:
         self.affix_host = False
         self.form_freq = None
         self.freq = None
-        self.skrt = False
         self._ = {}  # dict for any user specific data
 
+        self._char_types = UNSET
+        self._syls_idx = UNSET
+        self._syls_start_end = UNSET
+        self._skrt = UNSET
+        # (TokChunks, indices of the chunks of the token, start, length),
+        # kept until the lazy attributes are known
+        self._source = None
+
     def __getitem__(self, attr):
         # allows to access attributes with the Token['attr'] syntax, besides the Token.attr default
         try:
@@ -35,14 +92,133 @@ class Token:
         # enforces not to add any extra attribute. Token._ should be used for any custom data
         if hasattr(self, key):
             if key != "_":
-                self.__dict__[key] = value
+                setattr(self, key, value)
             else:
                 if not isinstance(value, dict):
                     raise TypeError("only dicts are accepted for Token._")
-                self.__dict__[key].update(value)
+                self._.update(value)
         else:
             raise AttributeError("Token objects don't have " + key + " as attribute")
 
+    def __deepcopy__(self, memo):
+        # the chunks of the document are shared by the copies
+        token = type(self).__new__(type(self))
+        for attr in self.__slots__:
+            value = getattr(self, attr)
+            setattr(token, attr, value if attr == "_source" else deepcopy(value, memo))
+        return token
+
+    def __getstate__(self):
+        # the lazy attributes are computed, so the chunks of the document are not pickled
+        state = {attr: getattr(self, attr) for attr in self.LAZY}
+        for attr in self.__slots__:
+            if not attr.startswith("_") or attr == "_":
+                state[attr] = getattr(self, attr)
+        return state
+
+    def __setstate__(self, state):
+        self._source = None
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
+    @property
+    def char_types(self):
+        if self._char_types is UNSET:
+            if self._source is None:
+                self._char_types = []
+            else:
+                chunks, _, start, length = self._source
+                self._char_types = [
+                    char_values[group] for group in chunks.bs.export_view(start, length)
+                ]
+            self.__release_source()
+        return self._char_types
+
+    @char_types.setter
+    def char_types(self, value):
+        self._char_types = value
+        self.__release_source()
+
+    @property
+    def syls_idx(self):
+        if self._syls_idx is UNSET:
+            if self.__has_syls():
+                chunks, idxs, start, _ = self._source
+                chars, offsets = chunks.syl_chars, chunks.syl_offsets
+                self._syls_idx = [
+                    [s - start for s in chars[offsets[i] : offsets[i + 1]]]
+                    for i in idxs
+                ]
+            else:
+                self._syls_idx = None
+            self.__release_source()
+        return self._syls_idx
+
+    @syls_idx.setter
+    def syls_idx(self, value):
+        self._syls_idx = value
+        self.__release_source()
+
+    @property
+    def syls_start_end(self):
+        if self._syls_start_end is UNSET:
+            if self.__has_syls():
+                chunks, idxs, start, _ = self._source
+                self._syls_start_end = []
+                for i in idxs:
+                    _, s, l = chunks.spans[i]
+                    self._syls_start_end.append(
+                        {"start": s - start, "end": s - start + l}
+                    )
+            else:
+                self._syls_start_end = None
+            self.__release_source()
+        return self._syls_start_end
+
+    @syls_start_end.setter
+    def syls_start_end(self, value):
+        self._syls_start_end = value
+        self.__release_source()
+
+    def __release_source(self):
+        # the chunks of the document are not needed anymore once all the lazy attributes are known
+        if self._source is not None and all(
+            value is not UNSET
+            for value in (
+                self._char_types,
+                self._syls_idx,
+                self._syls_start_end,
+                self._skrt,
+            )
+        ):
+            self._source = None
+
+    def __has_syls(self):
+        # a token made of a single non-syllable chunk has no syllables
+        if self._source is None:
+            return False
+        chunks, idxs, _, _ = self._source
+        return len(idxs) > 1 or chunks.syl_ids[idxs[0]] is not None
+
+    @property
+    def skrt(self):
+        if self._skrt is UNSET:
+            if self._source is None:
+                self._skrt = False
+            else:
+                chunks, _, start, length = self._source
+                self._skrt = is_sanskrit(
+                    chunks.bs.export_view(start, length),
+                    chunks.bs.string[start : start + length],
+                )
+            self.__release_source()
+        return self._skrt
+
+    @skrt.setter
+    def skrt(self, value):
+        self._skrt = value
+        self.__release_source()
+
     @property
     def syls(self):
         return (
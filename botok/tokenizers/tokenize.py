@@ -1,11 +1,23 @@
 # coding: utf-8
-from .token import Token
+from copy import copy
+
+from .token import Token, is_sanskrit
 from ..vars import NAMCHE, TSEK
 from ..vars import chunk_values as u
-from ..vars import char_values as a
-from ..vars import CharMarkers as A
 from ..vars import WordMarkers as w
-from ..third_party.has_skrt_syl import has_skrt_syl
+
+
+def copy_data(data):
+    """
+    Copies the data of a trie node, down to the dicts of its senses: the tokens modify their senses
+    (the pos and lemma of ``WordTokenizer``, etc.), while the trie is shared by all the tokens.
+    """
+    data = dict(data)
+    if "senses" in data:
+        data["senses"] = [dict(m) for m in data["senses"]]
+    if "affixation" in data:
+        data["affixation"] = dict(data["affixation"])
+    return data
 
 
 class Tokenize:
@@ -15,6 +27,7 @@ class Tokenize:
 
     def __init__(self, trie):
         self.pre_processed = None
+        self.spans = None
         self.trie = trie
 
     def tokenize(self, pre_processed, debug=False):
@@ -24,40 +37,60 @@ class Tokenize:
         :param debug: prints debug info in True
         :return: a list of Token objects
         """
+        # the state of the call is kept in a copy, so many threads can share a Tokenize
+        return copy(self)._tokenize(pre_processed, debug=debug)
+
+    def _tokenize(self, pre_processed, debug=False):
         self.pre_processed = pre_processed
         tokens = []
 
+        # the whole document is tokenized with the same version of the trie,
+        # even if the head of the trie is replaced meanwhile (see WordTokenizer.apply_delta())
+        head = self.trie.head
+
+        # the chunks and their cleaned syllables, see ``TokChunks``
+        self.spans = pre_processed.spans
+        offsets = pre_processed.syl_offsets
+        n_chunks = len(self.spans)
+
+        # the key of every syllable of the document in the trie, computed once per distinct syllable
+        trie_ids = [head.get_syl_id(syl) for syl in pre_processed.vocab]
+        syl_ids = [
+            trie_ids[syl_id] if syl_id is not None else None
+            for syl_id in pre_processed.syl_ids
+        ]
+
         c_idx = 0
-        while c_idx < len(self.pre_processed.chunks):
+        while c_idx < n_chunks:
             walker = c_idx
             syls = []
             max_match = []
-            match_data = {}
+            match_nodes = {}  # the data of the nodes is only read for the emitted tokens
             current_node = None
             found_max_match = False
 
             while True:
-                cur_syl = self.pre_processed.chunks[walker][0]
-                # CHUNK IS SYLLABLE
-                if cur_syl:
-                    syl = ''.join([self.pre_processed.bs.string[i] for i in cur_syl])
-                    current_node = self.trie.walk(syl, current_node)
+                # CHUNK IS SYLLABLE (with a non-empty cleaned syllable)
+                if offsets[walker + 1] > offsets[walker]:
+                    current_node = self.trie.walk_id(
+                        syl_ids[walker], current_node if current_node else head
+                    )
                     if current_node:
                         syls.append(walker)
                         if current_node.is_match():
-                            match_data[walker] = current_node.data
+                            match_nodes[walker] = current_node
                             max_match.append(syls[:])
                             # check if the matched is last
-                            if walker + 1 == len(self.pre_processed.chunks):
+                            if walker + 1 == n_chunks:
                                 found_max_match = True
                         else:
-                            if walker + 1 == len(self.pre_processed.chunks):
+                            if walker + 1 == n_chunks:
                                 if max_match:
                                     found_max_match = True
                                 else:
                                     # OOV syllables are turned into independant tokens
                                     self.add_found_word_or_non_word(
-                                        walker, match_data, syls, tokens
+                                        walker, match_nodes, syls, tokens
                                     )
                                     c_idx += len(syls)
                                     break
@@ -70,7 +103,7 @@ class Tokenize:
                             # check if syllables is NO_POS or Non-word
                             if syls:
                                 c_idx = self.add_found_word_or_non_word(
-                                    walker, match_data, syls, tokens
+                                    walker, match_nodes, syls, tokens
                                 )# Unexpected syl skip bug fix if chunk to process is in remove word list
                                 break
                             # syllabel is not in the dictionary (Trie)
@@ -89,7 +122,7 @@ class Tokenize:
                     # check for any syllables left, which are to be turned into independant tokens
                     elif syls:
                         c_idx = self.add_found_word_or_non_word(
-                            walker, match_data, syls, tokens
+                            walker, match_nodes, syls, tokens
                         )
                         if len(syls) == 1:
                             c_idx += 1
@@ -105,7 +138,7 @@ class Tokenize:
 
                 if found_max_match:
                     self.add_found_word_or_non_word(
-                        c_idx+len(max_match[-1])-1, match_data, max_match[-1], tokens
+                        c_idx+len(max_match[-1])-1, match_nodes, max_match[-1], tokens
                     )
                     c_idx += len(max_match[-1])
                     break
@@ -113,15 +146,16 @@ class Tokenize:
                 walker += 1
 
         self.pre_processed = None
+        self.spans = None
 
         return tokens
 
     def add_found_word_or_non_word(
-        self, c_idx, match_data, syls, tokens, has_decremented=False
+        self, c_idx, match_nodes, syls, tokens, has_decremented=False
     ):
         # there is a match
-        if c_idx in match_data.keys():
-            data = match_data[c_idx]
+        if c_idx in match_nodes.keys():
+            data = match_nodes[c_idx].data
             ttype = (
                 w.NO_POS.name
                 if "senses" not in data
@@ -129,13 +163,13 @@ class Tokenize:
                 else None
             )
             tokens.append(self.chunks_to_token(syls, data, ttype=ttype))
-        elif any(match_data.values()):
-            non_max_idx = sorted(match_data.keys())[-1]
+        elif any(match_nodes.values()):
+            non_max_idx = sorted(match_nodes.keys())[-1]
             non_max_syls = []
             for syl in syls:
                 if syl <= non_max_idx:
                     non_max_syls.append(syl)
-            data = match_data[non_max_idx]
+            data = match_nodes[non_max_idx].data
             ttype = (
                 w.NO_POS.name
                 if "senses" not in data
@@ -154,8 +188,8 @@ class Tokenize:
             if (
                 has_decremented
                 or (
-                    c_idx < len(self.pre_processed.chunks)
-                    and self.pre_processed.chunks[c_idx][0] is None
+                    c_idx < len(self.spans)
+                    and self.pre_processed.syl_ids[c_idx] is None
                 )
                 or len(syls) > 1
             ):
@@ -163,98 +197,50 @@ class Tokenize:
         return c_idx
 
     def chunks_to_token(self, syls, data, ttype=None):
-        if len(syls) == 1:
-            # chunk format: ([char_idx1, char_idx2, ...], (type, start_idx, len_idx))
-            token_syls = [self.pre_processed.chunks[syls[0]][0]]
-            token_type = self.pre_processed.chunks[syls[0]][1][0]
-            token_start = self.pre_processed.chunks[syls[0]][1][1]
-            token_length = self.pre_processed.chunks[syls[0]][1][2]
-            syl_start_end = [
-                (
-                    self.pre_processed.chunks[syls[0]][1][1],
-                    self.pre_processed.chunks[syls[0]][1][2],
-                )
-            ]
-            if ttype:
-                if "senses" not in data:
-                    data["senses"] = [{"pos": ttype}]
-                else:
-                    for m in data["senses"]:
-                        if "pos" not in m:
-                            m["pos"] = ttype
-
-            return self.create_token(
-                token_type, token_start, token_length, token_syls, syl_start_end, data
-            )
-        elif len(syls) > 1:
-            token_syls = [self.pre_processed.chunks[idx][0] for idx in syls]
-            token_type = self.pre_processed.chunks[syls[-1]][1][0]
-            token_start = self.pre_processed.chunks[syls[0]][1][1]
-            token_length = 0
-            syl_start_end = []
-            for i in syls:
-                token_length += self.pre_processed.chunks[i][1][2]
-                syl_start_end.append(
-                    (
-                        self.pre_processed.chunks[i][1][1],
-                        self.pre_processed.chunks[i][1][2],
-                    )
-                )
-            if ttype:
-                if "senses" not in data:
-                    data["senses"] = [{"pos": ttype}]
-                else:
-                    for m in data["senses"]:
-                        if "pos" not in m:
-                            m["pos"] = ttype
-
-            return self.create_token(
-                token_type, token_start, token_length, token_syls, syl_start_end, data
-            )
-        else:
+        if not syls:
             raise ValueError(str(syls) + "should contain at least 1 token")
 
-    def create_token(self, ttype, start, length, syls, syl_start_end, data):
+        # chunk format: (type, start_idx, len_idx)
+        token_type = self.spans[syls[-1]][0]
+        token_start = self.spans[syls[0]][1]
+        token_length = 0
+        for i in syls:
+            token_length += self.spans[i][2]
+        data = copy_data(data)
+        if ttype:
+            if "senses" not in data:
+                data["senses"] = [{"pos": ttype}]
+            else:
+                for m in data["senses"]:
+                    if "pos" not in m:
+                        m["pos"] = ttype
+
+        return self.create_token(token_type, token_start, token_length, syls, data)
+
+    def create_token(self, ttype, start, length, syls, data):
         """
         :param ttype: token type
         :param start: start index in input string
         :param length: length of the substring from the input string corresponding to this token
-        :param syls: syl representation coming from PyBoTextChunks.
-                        the indices are modified to be usable on the substring corresponding to this token
-        :param tag: the POS retrieved from the chunk or from the trie
-        :param freq: the frequency retrieved from from the trie
-        :return: a Token object with all the above information
+        :param syls: indices of the chunks of the token in TokChunks
+        :param data: the data of the token in the trie
+        :return: a Token object with all the above information.
+                 Its char_types, syls_idx, syls_start_end and skrt are computed on first access.
         """
         token = Token()
         token.text = self.pre_processed.bs.string[start : start + length]
         token.chunk_type = u[ttype]
         token.start = start
         token.len = length
-        if syls != [None]:
-            token.syls_idx = [[s - start for s in syl] for syl in syls]
-            token.syls_start_end = [
-                {"start": s - start, "end": s - start + l} for s, l in syl_start_end
-            ]
-        char_groups = self.pre_processed.bs.export_groups(
-            start, length, for_substring=True
-        )
-        token.char_types = [a[char_groups[idx]] for idx in sorted(char_groups.keys())]
+        token._source = (self.pre_processed, tuple(syls), start, length)
         for k, v in data.items():
-            token[k] = v
-        token.skrt = (
-            self.is_sanskrit(char_groups, token.text) if not token.skrt else token.skrt
-        )
+            # skrt is only computed when the trie doesn't flag the word as Sanskrit
+            if k != "skrt" or v:
+                token[k] = v
         return token
 
     def is_sanskrit(self, char_groups, word):
-        return self._has_skrt_char(char_groups) or has_skrt_syl(word)
-
-    def _has_skrt_char(self, char_groups):
-        return (
-            A.SKRT_VOW in char_groups.values()
-            or A.SKRT_CONS in char_groups.values()
-            or A.SKRT_SUB_CONS in char_groups.values()
-        )
+        return is_sanskrit(char_groups, word)
 
     @staticmethod
     def debug(debug, to_print):
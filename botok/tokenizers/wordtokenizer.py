@@ -1,5 +1,6 @@
 # coding: utf8
 import csv
+import os
 from pathlib import Path
 
 from ..chunks.chunks import TokChunks
@@ -10,6 +11,8 @@ from ..modifytokens.splitaffixed import split_affixed
 from ..textunits.bosyl import BoSyl
 from ..tries.trie import Trie
 from ..vars import AA, TSEK
+from . import batch
+from .columnar import ColumnarPipeline, RecordTokenize
 from .tokenize import Tokenize
 
 
@@ -32,10 +35,27 @@ class WordTokenizer:
     """
 
     def __init__(
-        self, config=None, ignore_chars=None, build_trie=False,
+        self,
+        config=None,
+        ignore_chars=None,
+        build_trie=False,
+        trie_backend="node",
+        build_processes=1,
+        trie_overlay=False,
+        base=None,
+        chunk_engine="pipeline",
     ):
         """
         :param tok_profile: profile for building the trie. (see config.yaml)
+        :param trie_backend: representation of the trie. "node", "compact" or "mmap" (see Trie)
+        :param build_processes: number of processes used to build the trie (see Trie)
+        :param trie_overlay: keeps the adjustments in an overlay, so the trie of the dictionary can be
+                             shared with other WordTokenizers (see ``base``)
+        :param base: a WordTokenizer of the same dialect pack, created with ``trie_overlay=True``.
+                     The trie of its dictionary is shared and only the adjustments of ``config``
+                     are kept in memory.
+        :param chunk_engine: "pipeline", "single_pass" or "numpy", the engine producing the chunks
+                             (see Chunks)
         """
         if not config:
             # if config is not given then use default config
@@ -43,6 +63,7 @@ class WordTokenizer:
 
         self.config = config
         self.ignore_chars = ignore_chars
+        self.chunk_engine = chunk_engine
         self.tok = Tokenize(
             Trie(
                 BoSyl,
@@ -51,6 +72,10 @@ class WordTokenizer:
                 custom_data=config.adjustments,
                 pickle_path=config.dialect_pack_path.parent,
                 build=build_trie,
+                backend=trie_backend,
+                processes=build_processes,
+                overlay=trie_overlay,
+                base=base.tok.trie if base is not None else None,
             )
         )
 
@@ -65,15 +90,47 @@ class WordTokenizer:
             / "particles.tsv"
         )
 
-    def tokenize(self, string, split_affixes=True, spaces_as_punct=False, debug=False):
+    def tokenize(
+        self,
+        string,
+        split_affixes=True,
+        spaces_as_punct=False,
+        debug=False,
+        expand_nfc=False,
+    ):
         """
         :param string: to be tokenized
         :param split_affixes: separates the affixed particles into seperate tokens if True
         :param debug: print debug info while parsing
+        :param expand_nfc: expands the NFC chars of ``string`` first (see ``BoString``). The starts of
+                           the tokens are then indices in the expanded string.
         :return: list of pybo.tokenizers.Token objects
         """
+        tokens = self._tokenize_unadjusted(
+            string,
+            split_affixes=split_affixes,
+            spaces_as_punct=spaces_as_punct,
+            debug=debug,
+            expand_nfc=expand_nfc,
+        )
+
+        # do adjustments
+        return self.adj.adjust(tokens)
+
+    def _tokenize_unadjusted(
+        self,
+        string,
+        split_affixes=True,
+        spaces_as_punct=False,
+        debug=False,
+        expand_nfc=False,
+    ):
         preprocessed = TokChunks(
-            string, ignore_chars=self.ignore_chars, space_as_punct=spaces_as_punct
+            string,
+            ignore_chars=self.ignore_chars,
+            space_as_punct=spaces_as_punct,
+            engine=self.chunk_engine,
+            expand_nfc=expand_nfc,
         )
         preprocessed.serve_syls_to_trie()
         tokens = self.tok.tokenize(preprocessed, debug=debug)
@@ -87,10 +144,158 @@ class WordTokenizer:
         # merge pa/po/ba/bo tokens with previous ones
         MergeDagdra().merge(tokens)
 
+        return tokens
+
+    def tokenize_columnar(self, string, split_affixes=True, spaces_as_punct=False):
+        """
+        Same as ``tokenize()``, without creating Token objects: the affixed particles are split, the
+        default lemmas chosen and the dagdras merged on rows holding only what these steps need.
+
+        Unlike ``tokenize()``, the adjustment rules of the dialect pack are not applied, since they
+        match Tokens (see ``AdjustTokens``). With a pack whose rules match the text, the tokens thus
+        differ from the ones of ``tokenize()``: use ``self.adj.rules`` to know if the pack has rules.
+
+        :return: a TokenColumns, the tokens as parallel arrays of starts, lengths, chunk-markers,
+                 POS ids, lemma ids and flags
+        """
+        preprocessed, records = self._get_records(
+            string, spaces_as_punct, self.chunk_engine
+        )
+        return ColumnarPipeline(self.part_lemmas).run(
+            preprocessed, records, split_affixes=split_affixes
+        )
+
+    def segment(self, string, split_affixes=True, spaces_as_punct=False):
+        """
+        Only finds the boundaries of the tokens of ``tokenize()``: the senses, lemmas, Sanskrit
+        detection and char_types are skipped. The "pipeline" chunk engine is replaced by
+        "single_pass", that produces the same chunks faster.
+
+        The adjustment rules match Tokens (see ``AdjustTokens``): when some of them merge or split
+        tokens, the boundaries are taken from ``tokenize()`` instead, which is not faster.
+
+        :return: the (start, end) indices of every token in ``string``
+        """
+        if self.adj.changes_boundaries():
+            tokens = self.tokenize(
+                string, split_affixes=split_affixes, spaces_as_punct=spaces_as_punct
+            )
+            return [(t.start, t.start + t.len) for t in tokens]
+
+        engine = "single_pass" if self.chunk_engine == "pipeline" else self.chunk_engine
+        preprocessed, records = self._get_records(string, spaces_as_punct, engine)
+        return ColumnarPipeline(self.part_lemmas).segment(
+            preprocessed, records, split_affixes=split_affixes
+        )
+
+    def tokenize_many(
+        self,
+        strings,
+        workers=None,
+        chunksize=16,
+        method="tokenize",
+        mp_context=None,
+        **kwargs,
+    ):
+        """
+        Tokenizes many strings in a pool of processes.
+
+        The strings are sent to the workers in batches of ``chunksize``, and only a few batches per
+        worker are read in advance, so ``strings`` can be a generator over a large corpus. When the
+        processes are forked, the workers inherit this WordTokenizer and its trie is not loaded again.
+        Otherwise, every worker creates a WordTokenizer with the same config, loading the trie saved
+        on disk: a ValueError is raised if ``apply_delta()`` was called, since the workers would not
+        see its changes.
+
+        When a worker crashes, the batches that were not completed are tokenized again in a new pool.
+        A batch crashing its worker more than twice raises a RuntimeError.
+
+        :param strings: an iterable of strings
+        :param workers: number of processes, ``os.cpu_count()`` if None. With 1, no pool is created.
+        :param chunksize: number of strings sent to a worker at once
+        :param method: "tokenize", "tokenize_columnar" or "segment"
+        :param mp_context: a multiprocessing context or the name of a start method, the default start
+                           method of the platform if None. "fork" is not safe in a process running
+                           other threads, and is not available or not safe on every platform.
+        :param kwargs: passed to ``method``
+        :return: a generator of the results of ``method``, in the order of ``strings``
+        """
+        return batch.tokenize_many(
+            self,
+            strings,
+            workers=workers,
+            chunksize=chunksize,
+            method=method,
+            mp_context=mp_context,
+            **kwargs,
+        )
+
+    def tokenize_parallel(
+        self,
+        string,
+        workers=None,
+        piece_size=50000,
+        split_affixes=True,
+        spaces_as_punct=False,
+        mp_context=None,
+    ):
+        """
+        Same as ``tokenize()``, for a long string: it is cut in pieces of about ``piece_size`` chars
+        after punctuation (see ``TokChunks.find_punct_cuts()``), that are tokenized in a pool of
+        processes (see ``tokenize_many()``). The tokens of the pieces are the ones of the whole string,
+        their starts are made relative to it. The adjustment rules are then applied on all the tokens.
+
+        :param workers: number of processes, ``os.cpu_count()`` if None
+        :param piece_size: minimum number of chars of the pieces, but the last one
+        :param mp_context: see ``tokenize_many()``
+        :return: list of Token objects
+        """
+        cuts = TokChunks.find_punct_cuts(
+            string,
+            piece_size,
+            ignore_chars=self.ignore_chars,
+            space_as_punct=spaces_as_punct,
+        )
+        pieces = [string[s:e] for s, e in zip(cuts, cuts[1:] + [len(string)])]
+        results = batch.tokenize_many(
+            self,
+            pieces,
+            workers=min(workers or os.cpu_count() or 1, len(pieces)),
+            chunksize=1,
+            method="_tokenize_unadjusted",
+            mp_context=mp_context,
+            split_affixes=split_affixes,
+            spaces_as_punct=spaces_as_punct,
+        )
+
+        tokens = []
+        for offset, piece_tokens in zip(cuts, results):
+            for token in piece_tokens:
+                token.start += offset
+            tokens.extend(piece_tokens)
+
         # do adjustments
-        tokens = self.adj.adjust(tokens)
+        return self.adj.adjust(tokens)
 
-        return tokens
+    def _get_records(self, string, spaces_as_punct, engine):
+        preprocessed = TokChunks(
+            string,
+            ignore_chars=self.ignore_chars,
+            space_as_punct=spaces_as_punct,
+            engine=engine,
+        )
+        preprocessed.serve_syls_to_trie()
+        return preprocessed, RecordTokenize(self.tok.trie).tokenize(preprocessed)
+
+    def apply_delta(self, words=None, remove=None):
+        """
+        Updates the dictionary without rebuilding the trie, while other threads keep tokenizing.
+
+        :param words: lines in the format of the dictionary files (form, pos, lemma, sense, freq).
+                      New words are added, the senses of existing words are replaced.
+        :param remove: words to remove
+        """
+        self.tok.trie.apply_delta(words=words, remove=remove)
 
     def _get_default_lemma(self, token_list):
         for t in token_list:
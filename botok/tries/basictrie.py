@@ -3,6 +3,10 @@
 # inspired from https://gist.github.com/nickstanisha/733c134a0171a00f66d4
 # and           https://github.com/eroux/tibetan-phonetics-py
 
+from sys import intern
+
+from .compacttrie import CompactTrie
+
 
 class Node:
     def __init__(self, label=None, leaf=False, data=None):
@@ -15,9 +19,26 @@ class Node:
 
     def add_child(self, key, leaf=False):
         if not isinstance(key, Node):
+            key = intern(key)  # a single string object for every occurrence of a syllable
             self.children[key] = Node(key, leaf)
+            return self.children[key]
         else:
             self.children[key.leaf] = key
+            return key
+
+    def get_child(self, key):
+        return self.children.get(key)
+
+    def writable_data(self):
+        # the data of a node that is modified in place, see ``OverlayNode.writable_data()``
+        return self.data
+
+    def get_syl_id(self, syl):
+        # the edges of Node tries are keyed by the syllables themselves
+        return syl
+
+    def get_child_id(self, syl_id):
+        return self.children.get(syl_id)
 
     def can_walk(self):
         return self.children != dict()
@@ -29,50 +50,77 @@ class Node:
         return self.children[key]
 
 
+def copy_trie(src, dst):
+    """Copies all the nodes found under the head ``src`` under the head ``dst``.
+
+    Both heads can be of any node type (``Node``, ``CompactNode``), which allows to convert
+    a trie from one representation to the other.
+    """
+    stack = [(src, dst)]
+    while stack:
+        src_node, dst_node = stack.pop()
+        dst_node.leaf = src_node.leaf
+        if src_node.data != {"_": {}}:
+            dst_node.data = src_node.data
+        for label, child in src_node.children.items():
+            stack.append((child, dst_node.add_child(label)))
+    return dst
+
+
 class BasicTrie:
-    def __init__(self):
-        self.head = Node()
+    def __init__(self, compact=False):
+        """
+        :param compact: stores the nodes in the flat arrays of a ``CompactTrie`` instead of
+                        one ``Node`` object per node.
+        """
+        self.compact = compact
+        self.head = self.new_head()
+
+    def new_head(self):
+        return CompactTrie().head if self.compact else Node()
 
     def __getitem__(self, key):
-        return self.head.children[key]
+        return self.head[key]
 
     def add(self, word, data=None):
         # adding the word
         current_node = self.head
-        word_finished = True
-
-        i = 0
-        for i in range(len(word)):
-            if word[i] in current_node.children:
-                current_node = current_node.children[word[i]]
-            else:
-                word_finished = False
-                break
-
-        if not word_finished:
-            while i < len(word):
-                current_node.add_child(word[i])
-                current_node = current_node.children[word[i]]
-                i += 1
+        for syl in word:
+            next_node = current_node.get_child(syl)
+            if next_node is None:
+                next_node = current_node.add_child(syl)
+            current_node = next_node
 
         current_node.leaf = True
 
         # adding data to the node
         if data:
             assert isinstance(data, dict)
-            current_node.data.update(data)
+            current_node.writable_data().update(data)
 
     def walk(self, char, current_node=None):
         # logic of walking the trie adapted to be done outside the trie class (for Tokenize)
         if not current_node:
             current_node = self.head
 
-        if char in current_node.children:
-            next_node = current_node[char]
-        else:
-            next_node = None
+        return current_node.get_child(char)
 
-        return next_node
+    def get_syl_id(self, syl):
+        """
+        :return: the key of ``syl`` in the edges of the trie, to be used with ``walk_id()``.
+                 The syllable itself in a trie of ``Node`` objects, an integer in the compact and mapped tries.
+                 None if the syllable is known not to be in the trie.
+        """
+        return self.head.get_syl_id(syl)
+
+    def walk_id(self, syl_id, current_node=None):
+        # same as walk(), with a key returned by get_syl_id()
+        if syl_id is None:
+            return None
+        if not current_node:
+            current_node = self.head
+
+        return current_node.get_child_id(syl_id)
 
     def has_word(self, word):
         if not word:
@@ -82,8 +130,9 @@ class BasicTrie:
         current_node = self.head
         exists = True
         for syl in word:
-            if syl in current_node.children:
-                current_node = current_node.children[syl]
+            next_node = current_node.get_child(syl)
+            if next_node is not None:
+                current_node = next_node
             else:
                 exists = False
                 break
@@ -110,9 +159,8 @@ class BasicTrie:
         # parse word
         current_node = self.head
         for syl in word:
-            if syl in current_node.children:
-                current_node = current_node.children[syl]
-            else:
+            current_node = current_node.get_child(syl)
+            if current_node is None:
                 return False
 
         # not a complete word
@@ -120,13 +168,14 @@ class BasicTrie:
             return False
 
         # adding data
+        node_data = current_node.writable_data()
         if isinstance(data, int):
-            current_node.data["form_freq"] = data
+            node_data["form_freq"] = data
             added = True
         else:
-            if "senses" not in current_node.data:
-                current_node.data["senses"] = []
-            added = self.add_meaning(current_node.data["senses"], data)
+            if "senses" not in node_data:
+                node_data["senses"] = []
+            added = self.add_meaning(node_data["senses"], data)
         return added
 
     def add_meaning(self, meanings, meaning):
@@ -157,9 +206,8 @@ class BasicTrie:
         """
         current_node = self.head
         for syl in word:
-            if syl in current_node.children:
-                current_node = current_node.children[syl]
-            else:
+            current_node = current_node.get_child(syl)
+            if current_node is None:
                 return False
         if isinstance(current_node.data, dict):
             if not rev:
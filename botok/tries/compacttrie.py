@@ -0,0 +1,187 @@
+# coding: utf-8
+from array import array
+
+
+class CompactNode:
+    """
+    Light-weight view on a node stored in a ``CompactTrie``.
+
+    It exposes the same interface as ``basictrie.Node`` (label, leaf, data, children, add_child(),
+    get_child(), get_syl_id(), get_child_id(), can_walk(), is_match()), so ``BasicTrie``, ``Trie``
+    and ``Tokenize`` can use it transparently. Views are created on the fly while walking and only
+    hold the index of the node.
+    """
+
+    __slots__ = ("trie", "idx")
+
+    def __init__(self, trie, idx):
+        self.trie = trie
+        self.idx = idx
+
+    @property
+    def label(self):
+        syl_id = self.trie.labels[self.idx]
+        return self.trie.syls[syl_id] if syl_id >= 0 else None
+
+    @property
+    def leaf(self):
+        return bool(self.trie.leaves[self.idx])
+
+    @leaf.setter
+    def leaf(self, value):
+        self.trie.leaves[self.idx] = 1 if value else 0
+
+    @property
+    def data(self):
+        return self.trie.get_data(self.idx)
+
+    @data.setter
+    def data(self, value):
+        self.trie.data[self.idx] = value
+
+    def writable_data(self):
+        return self.data
+
+    @property
+    def children(self):
+        return {
+            self.trie.syls[self.trie.labels[c]]: CompactNode(self.trie, c)
+            for c in self.trie.iter_children(self.idx)
+        }
+
+    def add_child(self, key, leaf=False):
+        return CompactNode(self.trie, self.trie.add_node(self.idx, key, leaf))
+
+    def get_child(self, key):
+        child = self.trie.find_child(self.idx, key)
+        return CompactNode(self.trie, child) if child is not None else None
+
+    def get_syl_id(self, syl):
+        return self.trie.syl_ids.get(syl)
+
+    def get_child_id(self, syl_id):
+        child = self.trie.edges.get((self.idx << 32) | syl_id)
+        return CompactNode(self.trie, child) if child is not None else None
+
+    def can_walk(self):
+        return self.trie.first_child[self.idx] != -1
+
+    def is_match(self):
+        return self.trie.leaves[self.idx] == 1
+
+    def __getitem__(self, key):
+        child = self.get_child(key)
+        if child is None:
+            raise KeyError(key)
+        return child
+
+
+class CompactTrie:
+    """
+    Array-backed storage for a trie.
+
+    Instead of one ``Node`` object per syllable edge, each with its own ``children`` and ``data`` dicts,
+    all the nodes live in flat parallel arrays indexed by node id:
+        - labels:       the id of the syllable leading to the node (-1 for the head)
+        - leaves:       1 if a word ends on the node, 0 otherwise
+        - first_child:  id of the first child of the node (-1 if none)
+        - next_sibling: id of the next child of the same parent (-1 if none)
+        - data:         the data dict of the node. None stands for the default ``{'_': {}}`` or for the data
+                        of a node loaded from a ``MappedTrie``, which are only created when the data of
+                        the node is accessed.
+
+    Syllables are interned in ``syls``/``syl_ids`` and the edges are found in a single dict whose keys
+    combine the id of the parent node and the id of the syllable.
+
+    The head of the trie, a ``CompactNode`` view, is what ``BasicTrie`` manipulates.
+    """
+
+    def __init__(self):
+        self.syl_ids = {}
+        self.syls = []
+        self.labels = array("l", [-1])
+        self.leaves = bytearray(1)
+        self.first_child = array("l", [-1])
+        self.next_sibling = array("l", [-1])
+        self.data = [None]
+        self.edges = {}
+        self.base = None  # MappedTrie the nodes were loaded from
+        self.head = CompactNode(self, 0)
+
+    @classmethod
+    def from_mapped(cls, mapped):
+        """
+        Loads all the nodes of a ``MappedTrie``, keeping their ids.
+        The data of a node is only decoded from ``mapped`` when it is accessed.
+        """
+        trie = cls()
+        n = mapped.n_nodes
+        trie.syls = [mapped.get_syl(syl_id) for syl_id in range(mapped.n_syls)]
+        trie.syl_ids = {syl: syl_id for syl_id, syl in enumerate(trie.syls)}
+        trie.labels = array("l", mapped.labels)
+        trie.leaves = bytearray(mapped.leaves)
+        trie.first_child = array("l", [-1]) * n
+        trie.next_sibling = array("l", range(1, n + 1))  # siblings have consecutive ids
+        trie.next_sibling[0] = -1
+        trie.data = [None] * n
+        trie.base = mapped
+
+        child_start, edge_syls, edges = mapped.child_start, mapped.edge_syls, trie.edges
+        for parent in range(n):
+            start, end = child_start[parent], child_start[parent + 1]
+            if start != end:
+                trie.first_child[parent] = start + 1
+                trie.next_sibling[end] = -1
+                for e in range(start, end):
+                    edges[(parent << 32) | edge_syls[e]] = e + 1
+        return trie
+
+    def __len__(self):
+        return len(self.labels)
+
+    @staticmethod
+    def edge_key(parent, syl_id):
+        return (parent << 32) | syl_id
+
+    def find_child(self, parent, syl):
+        syl_id = self.syl_ids.get(syl)
+        if syl_id is None:
+            return None
+        return self.edges.get((parent << 32) | syl_id)
+
+    def add_node(self, parent, syl, leaf=False):
+        syl_id = self.syl_ids.get(syl)
+        if syl_id is None:
+            syl_id = len(self.syls)
+            self.syl_ids[syl] = syl_id
+            self.syls.append(syl)
+
+        key = self.edge_key(parent, syl_id)
+        if key in self.edges:
+            return self.edges[key]
+
+        idx = len(self.labels)
+        self.labels.append(syl_id)
+        self.leaves.append(1 if leaf else 0)
+        self.first_child.append(-1)
+        self.next_sibling.append(self.first_child[parent])
+        self.first_child[parent] = idx
+        self.data.append(None)
+        self.edges[key] = idx
+        return idx
+
+    def iter_children(self, parent):
+        child = self.first_child[parent]
+        while child != -1:
+            yield child
+            child = self.next_sibling[child]
+
+    def get_data(self, idx):
+        data = self.data[idx]
+        if data is None:
+            if self.base is not None and idx < self.base.n_nodes:
+                data = self.base.decode_data(idx)
+            else:
+                data = {"_": {}}
+            self.data[idx] = data
+        return data
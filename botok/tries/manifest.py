@@ -0,0 +1,145 @@
+# coding: utf-8
+import hashlib
+import json
+from pathlib import Path
+
+
+class TrieManifest:
+    """
+    Records the content of the dictionary files a cached trie was built from.
+
+    For every file, in the order they were added to the trie, the manifest keeps:
+        - its path, relative to the dialect pack (``root``), and its category (the name of its folder)
+        - the sha256 hash of its content
+        - its entries: for every line, a hash of the line and the keys (syllables joined with tseks)
+          of the words it modifies, encoded in a string (see ``encode_entry()``)
+
+    Comparing the manifest with the current files tells which entries changed since the trie was built,
+    which allows ``Trie`` to only replay those instead of rebuilding everything. The lines replayed are
+    read from the files.
+    """
+
+    # the format of the saved manifests, the ones of another format are not loaded
+    FORMAT = 2
+
+    def __init__(self, version=None, files=None, root=None):
+        """
+        :param root: the directory of the dialect pack. The paths of the files it contains are kept
+                     relative to it, so the pack can be moved with its trie.
+        """
+        self.version = version
+        self.files = files if files else []
+        self.root = Path(root).resolve() if root else None
+
+    def add_file(self, path, category, entries, digest=None):
+        self.files.append(
+            {
+                "path": self.relative(path),
+                "category": category,
+                "hash": digest if digest else self.hash_file(path),
+                "entries": entries,
+            }
+        )
+
+    def relative(self, path):
+        """:return: ``path`` relative to ``root`` if it is in it, as saved in the manifest"""
+        if self.root is not None:
+            try:
+                return Path(path).resolve().relative_to(self.root).as_posix()
+            except ValueError:
+                pass
+        return str(path)
+
+    @staticmethod
+    def hash_file(path):
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+    @staticmethod
+    def hash_line(line):
+        return hashlib.blake2b(line.encode("utf-8"), digest_size=8).hexdigest()
+
+    @staticmethod
+    def encode_entry(line_hash, keys):
+        return "\t".join([line_hash] + keys)
+
+    @staticmethod
+    def iter_entries(f):
+        """Yields the (hash of the line, keys) of the entries of a file of the manifest."""
+        for entry in f["entries"]:
+            line_hash, *keys = entry.split("\t")
+            yield line_hash, keys
+
+    @property
+    def digest(self):
+        """A hash of the content of all the files, in the order they are applied."""
+        h = hashlib.sha256()
+        for f in self.files:
+            h.update(f"{f['category']}\t{f['hash']}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def compare(self, files):
+        """
+        :param files: the data files of a trie, as found in ``Config.dictionary``
+        :return: None if the files common to both were reordered,
+                 otherwise the list of (category, path, hash) of the current files
+                 and the list of the records of the files that were deleted.
+        """
+        known = {(f["category"], f["path"]): f for f in self.files}
+        current = [
+            (category, path, self.hash_file(path))
+            for category, path in iter_data_files(files)
+        ]
+        current_ids = {(category, self.relative(path)) for category, path, _ in current}
+
+        previous_order = [
+            (f["category"], f["path"])
+            for f in self.files
+            if (f["category"], f["path"]) in current_ids
+        ]
+        current_order = [
+            (category, self.relative(path))
+            for category, path, _ in current
+            if (category, self.relative(path)) in known
+        ]
+        if previous_order != current_order:
+            return None
+
+        deleted = [
+            f for f in self.files if (f["category"], f["path"]) not in current_ids
+        ]
+        return current, deleted
+
+    def get_file(self, category, path):
+        path = self.relative(path)
+        for f in self.files:
+            if f["category"] == category and f["path"] == path:
+                return f
+        return None
+
+    def save(self, out_file):
+        with Path(out_file).open("w", encoding="utf-8") as f:
+            json.dump(
+                {"format": self.FORMAT, "version": self.version, "files": self.files},
+                f,
+                ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(cls, in_file, root=None):
+        in_file = Path(in_file)
+        if not in_file.is_file():
+            return None
+        with in_file.open(encoding="utf-8") as f:
+            content = json.load(f)
+        if content.get("format") != cls.FORMAT:
+            return None
+        return cls(version=content["version"], files=content["files"], root=root)
+
+
+def iter_data_files(files):
+    """Yields (category, path) for the files of a trie, in the order they are applied."""
+    lexica = [d for d in files if d.startswith("lexica")]
+    rest = [d for d in files if not d.startswith("lexica") and not d.startswith("rules")]
+    for category in lexica + rest:
+        for f in files[category]:
+            yield category, f
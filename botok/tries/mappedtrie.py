@@ -0,0 +1,420 @@
+# coding: utf-8
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+MAGIC = b"BOTOKMT\x00"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sII")  # magic, format version, length of the json header
+DEFAULT_DATA = {"_": {}}
+SPLIT_KEY = "senses"  # every sense is a record of its own
+
+# name and typecode of every section of the file, in the order they are written
+SECTIONS = [
+    ("syl_offsets", "I"),
+    ("syl_blob", "B"),
+    ("labels", "i"),
+    ("child_start", "I"),
+    ("edge_syls", "I"),
+    ("leaves", "B"),
+    ("payload_offsets", "I"),
+    ("node_records", "I"),
+    ("record_offsets", "I"),
+    ("record_blob", "B"),
+]
+
+
+def write_mapped_trie(head, out_file, **metadata):
+    """Serializes the trie starting at ``head`` in the binary format read by ``MappedTrie``.
+
+    ``head`` can be of any node type (``Node``, ``CompactNode``, ``MappedNode``).
+    The nodes are numbered in breadth-first order, so the children of every node are found
+    in a contiguous range of the edge array, sorted by syllable id. Edge ``e`` leads to node ``e + 1``.
+    Syllable ids are the rank of the syllables sorted by their utf-8 encoding.
+
+    The data of a node is a list of records, each holding the json of a ``[key, value]`` pair.
+    Every sense is a record of its own. Records are interned: the data of the many nodes sharing
+    the same senses or affixation is stored once. Nodes with the default data take no space.
+
+    The file is written next to ``out_file`` then moved over it, so processes that have mapped
+    a previous version keep reading a consistent file.
+
+    :param head: head node of the trie to serialize
+    :param out_file: path of the file to write
+    :param metadata: json-serializable values stored in the header of the file
+    """
+    # 1. number the nodes
+    nodes = [head]
+    labels = [None]
+    first_children = []
+    syls = set()
+    i = 0
+    while i < len(nodes):
+        node_children = sorted(
+            nodes[i].children.items(), key=lambda item: item[0].encode("utf-8")
+        )
+        first_children.append(len(nodes))
+        for label, child in node_children:
+            nodes.append(child)
+            labels.append(label)
+            syls.add(label)
+        i += 1
+
+    # 2. syllable table
+    syls = sorted(syls, key=lambda s: s.encode("utf-8"))
+    syl_ids = {syl: num for num, syl in enumerate(syls)}
+    syl_offsets = array("I", [0])
+    syl_blob = bytearray()
+    for syl in syls:
+        syl_blob += syl.encode("utf-8")
+        syl_offsets.append(len(syl_blob))
+
+    # 3. node and edge tables
+    n = len(nodes)
+    sections = {
+        "syl_offsets": syl_offsets,
+        "syl_blob": syl_blob,
+        "labels": array("i", [-1] + [syl_ids[l] for l in labels[1:]]),
+        "child_start": array("I", [first - 1 for first in first_children] + [n - 1]),
+        "edge_syls": array("I", [syl_ids[l] for l in labels[1:]]),
+        "leaves": bytearray(1 if node.leaf else 0 for node in nodes),
+        "payload_offsets": array("I", [0]),
+        "node_records": array("I"),
+        "record_offsets": array("I", [0]),
+        "record_blob": bytearray(),
+    }
+
+    # 4. payloads
+    payload_offsets, node_records = sections["payload_offsets"], sections["node_records"]
+    record_offsets, record_blob = sections["record_offsets"], sections["record_blob"]
+    records = {}
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for node in nodes:
+        data = node.data
+        if data != DEFAULT_DATA:
+            for key, value in data.items():
+                if (
+                    key == SPLIT_KEY
+                    and value
+                    and all(isinstance(v, dict) for v in value)
+                ):
+                    pairs = [[key, v] for v in value]
+                else:
+                    pairs = [[key, value]]
+                for pair in pairs:
+                    record = encode(pair).encode("utf-8")
+                    if record not in records:
+                        records[record] = len(records)
+                        record_blob += record
+                        record_offsets.append(len(record_blob))
+                    node_records.append(records[record])
+        payload_offsets.append(len(node_records))
+
+    # 5. write
+    header = {
+        "botok_version": metadata.pop("version", None),
+        "byteorder": sys.byteorder,
+        "n_nodes": n,
+        "n_syls": len(syls),
+        "metadata": metadata,
+        "sections": {},
+    }
+    sections = {name: bytes(content) for name, content in sections.items()}
+    offset = 0
+    for name, _ in SECTIONS:
+        size = len(sections[name])
+        header["sections"][name] = [offset, size]
+        offset += size + (-size % 8)  # keep every section 8-byte aligned
+
+    encoded = json.dumps(header).encode("utf-8")
+    encoded += b" " * (-(HEADER.size + len(encoded)) % 8)
+
+    out_file = Path(out_file)
+    tmp_file = out_file.with_name(out_file.name + f".{os.getpid()}.tmp")
+    with tmp_file.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, _ in SECTIONS:
+            f.write(sections[name])
+            f.write(b"\0" * (-len(sections[name]) % 8))
+    os.replace(tmp_file, out_file)
+
+
+def convert_pickled_trie(pickled_file, out_file):
+    """Converts a trie pickled by ``Trie`` into the format read by ``MappedTrie``."""
+    with Path(pickled_file).open("rb") as f:
+        head = pickle.load(f)
+    version = head.data["_"].get("version")
+    write_mapped_trie(head, out_file, version=version)
+
+
+class MappedNode:
+    """
+    View on a node of a ``MappedTrie``.
+
+    Exposes the same interface as ``basictrie.Node``.
+    The nodes that are added to a mapped trie are kept in memory and numbered after the nodes of the file.
+    """
+
+    __slots__ = ("trie", "idx")
+
+    def __init__(self, trie, idx):
+        self.trie = trie
+        self.idx = idx
+
+    @property
+    def label(self):
+        if self.idx >= self.trie.n_nodes:
+            syl_id = self.trie.added_labels[self.idx - self.trie.n_nodes]
+        else:
+            syl_id = self.trie.labels[self.idx]
+        return self.trie.get_syl(syl_id) if syl_id >= 0 else None
+
+    @property
+    def leaf(self):
+        leaf = self.trie.leaf_changes.get(self.idx)
+        if leaf is None:
+            return self.idx < self.trie.n_nodes and self.trie.leaves[self.idx] == 1
+        return leaf
+
+    @leaf.setter
+    def leaf(self, value):
+        self.trie.leaf_changes[self.idx] = bool(value)
+
+    @property
+    def data(self):
+        return self.trie.get_data(self.idx)
+
+    @data.setter
+    def data(self, value):
+        self.trie.data_changes[self.idx] = value
+
+    def writable_data(self):
+        # only the data that is modified is kept in memory, reading decodes it anew
+        data = self.trie.data_changes.get(self.idx)
+        if data is None:
+            data = self.trie.data_changes[self.idx] = self.trie.get_data(self.idx)
+        return data
+
+    @property
+    def children(self):
+        return {
+            self.trie.get_syl(syl_id): MappedNode(self.trie, child)
+            for syl_id, child in self.trie.iter_children(self.idx)
+        }
+
+    def add_child(self, key, leaf=False):
+        return MappedNode(self.trie, self.trie.add_node(self.idx, key, leaf))
+
+    def get_child(self, key):
+        return self.get_child_id(self.trie.get_syl_id(key))
+
+    def get_syl_id(self, syl):
+        return self.trie.get_syl_id(syl)
+
+    def get_child_id(self, syl_id):
+        if syl_id is None:
+            return None
+        child = self.trie.find_child(self.idx, syl_id)
+        return MappedNode(self.trie, child) if child is not None else None
+
+    def can_walk(self):
+        return (
+            self.idx < self.trie.n_nodes
+            and self.trie.child_start[self.idx] != self.trie.child_start[self.idx + 1]
+        ) or self.idx in self.trie.added_children
+
+    def is_match(self):
+        return self.leaf
+
+    def __getitem__(self, key):
+        child = self.get_child(key)
+        if child is None:
+            raise KeyError(key)
+        return child
+
+
+class MappedTrie:
+    """
+    Read-only trie walked directly in a memory-mapped file written by ``write_mapped_trie()``.
+
+    Nothing is deserialized upon opening: the arrays are zero-copy views on the mapped file,
+    so all the processes of a host opening the same file share a single copy in the page cache.
+    The data of a node is only decoded when it is accessed.
+    With ``in_memory=True``, the file is read in a private buffer instead of being mapped.
+
+    Changes made through the nodes (new words, data, deactivation) are kept in process memory
+    and never written to the file. Added nodes and syllables are numbered after the ones of the file.
+    """
+
+    def __init__(self, in_file, in_memory=False):
+        self.file = Path(in_file)
+        if in_memory:
+            self.mm = self.file.read_bytes()
+        else:
+            with self.file.open("rb") as f:
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_len = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise IOError(f"{self.file} is not a mapped botok trie.")
+        if version != FORMAT_VERSION:
+            raise IOError(
+                f"{self.file} uses format {version}. Supported format: {FORMAT_VERSION}"
+            )
+        self.header = json.loads(self.mm[HEADER.size : HEADER.size + header_len])
+        if self.header["byteorder"] != sys.byteorder:
+            raise IOError(f"{self.file} was written on a platform of another byteorder.")
+
+        start = HEADER.size + header_len
+        view = memoryview(self.mm)
+        for name, typecode in SECTIONS:
+            offset, size = self.header["sections"][name]
+            section = view[start + offset : start + offset + size]
+            setattr(self, name, section.cast(typecode) if typecode != "B" else section)
+
+        self.n_nodes = self.header["n_nodes"]
+        self.n_syls = self.header["n_syls"]
+        self.syl_blob_start = start + self.header["sections"]["syl_blob"][0]
+        self.syl_cache = {}
+
+        # in-memory changes
+        self.leaf_changes = {}
+        self.data_changes = {}
+        self.added_syls = []  # syllables that are not in the file
+        self.added_syl_ids = {}
+        self.added_labels = []
+        self.added_children = {}  # parent: [child, ...]
+        self.added_edges = {}  # (parent << 32) | syl_id: child
+
+        self.head = MappedNode(self, 0)
+
+    @property
+    def version(self):
+        return self.header["botok_version"]
+
+    @property
+    def metadata(self):
+        return self.header["metadata"]
+
+    def get_encoded_syl(self, syl_id):
+        return self.mm[
+            self.syl_blob_start
+            + self.syl_offsets[syl_id] : self.syl_blob_start
+            + self.syl_offsets[syl_id + 1]
+        ]
+
+    def get_syl(self, syl_id):
+        if syl_id >= self.n_syls:
+            return self.added_syls[syl_id - self.n_syls]
+        return self.get_encoded_syl(syl_id).decode("utf-8")
+
+    def get_syl_id(self, syl):
+        """
+        :return: the id of ``syl`` in the syllable table of the file or among the added syllables,
+                 None if no edge of the trie bears it.
+        """
+        if syl in self.syl_cache:
+            return self.syl_cache[syl]
+
+        # binary search in the sorted syllable table
+        encoded = syl.encode("utf-8")
+        lo, hi = 0, self.n_syls
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.get_encoded_syl(mid) < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_syls and self.get_encoded_syl(lo) == encoded:
+            syl_id = lo
+        else:
+            syl_id = self.added_syl_ids.get(syl)
+
+        if len(self.syl_cache) > 2 * self.n_syls + 10000:
+            self.syl_cache.clear()  # out-of-vocabulary syllables are cached too
+        self.syl_cache[syl] = syl_id
+        return syl_id
+
+    def find_child(self, parent, syl_id):
+        if self.added_edges:
+            child = self.added_edges.get((parent << 32) | syl_id)
+            if child is not None:
+                return child
+
+        if parent >= self.n_nodes or syl_id >= self.n_syls:
+            return None
+        lo, hi = self.child_start[parent], self.child_start[parent + 1]
+        e = bisect_left(self.edge_syls, syl_id, lo, hi)
+        if e < hi and self.edge_syls[e] == syl_id:
+            return e + 1
+        return None
+
+    def iter_children(self, parent):
+        """Yields the (syl_id, node) pairs of the children of ``parent``"""
+        if parent < self.n_nodes:
+            for e in range(self.child_start[parent], self.child_start[parent + 1]):
+                yield self.edge_syls[e], e + 1
+        for child in self.added_children.get(parent, []):
+            yield self.added_labels[child - self.n_nodes], child
+
+    def add_node(self, parent, syl, leaf=False):
+        syl_id = self.get_syl_id(syl)
+        if syl_id is None:
+            syl_id = self.n_syls + len(self.added_syls)
+            self.added_syls.append(syl)
+            self.added_syl_ids[syl] = syl_id
+            self.syl_cache[syl] = syl_id
+        else:
+            child = self.find_child(parent, syl_id)
+            if child is not None:
+                return child
+
+        idx = self.n_nodes + len(self.added_labels)
+        self.added_labels.append(syl_id)
+        self.added_children.setdefault(parent, []).append(idx)
+        self.added_edges[(parent << 32) | syl_id] = idx
+        if leaf:
+            self.leaf_changes[idx] = True
+        return idx
+
+    def get_data(self, idx):
+        """
+        :return: the modified data of the node ``idx``, or a new dict decoded from the file, which is
+                 not kept in memory (see ``MappedNode.writable_data()``)
+        """
+        data = self.data_changes.get(idx)
+        if data is None:
+            if idx >= self.n_nodes:
+                return {"_": {}}
+            return self.decode_data(idx)
+        return data
+
+    def decode_data(self, idx):
+        """
+        :return: a new dict holding the data of the node ``idx`` of the file
+        """
+        start, end = self.payload_offsets[idx], self.payload_offsets[idx + 1]
+        if start == end:
+            return {"_": {}}
+
+        data = {}
+        for record in self.node_records[start:end]:
+            key, value = json.loads(
+                bytes(
+                    self.record_blob[
+                        self.record_offsets[record] : self.record_offsets[record + 1]
+                    ]
+                )
+            )
+            if key == SPLIT_KEY and isinstance(value, dict):
+                data.setdefault(key, []).append(value)
+            else:
+                data[key] = value
+        return data
@@ -0,0 +1,160 @@
+# coding: utf-8
+from copy import deepcopy
+
+
+class Delta:
+    """
+    Changes made by an ``OverlayTrie`` to a node of its base. ``None`` means the value of the base is kept.
+    """
+
+    __slots__ = ("leaf", "data", "children")
+
+    def __init__(self, leaf=None):
+        self.leaf = leaf
+        self.data = None
+        self.children = {}
+
+
+class OverlayNode:
+    """
+    View combining a node of the base trie and its ``Delta`` in the overlay.
+    Either of them is None when the node only exists in the other.
+
+    Exposes the same interface as ``basictrie.Node``.
+    """
+
+    __slots__ = ("overlay", "base", "delta", "parent", "key")
+
+    def __init__(self, overlay, base, delta, parent, key):
+        self.overlay = overlay
+        self.base = base
+        self.delta = delta
+        self.parent = parent
+        self.key = key
+
+    def get_delta(self):
+        # the deltas are created along the path of a node when it is modified
+        if self.delta is None:
+            children = self.parent.get_delta().children
+            if self.key not in children:
+                children[self.key] = Delta()
+            self.delta = children[self.key]
+        return self.delta
+
+    @property
+    def label(self):
+        return self.key
+
+    @property
+    def leaf(self):
+        if self.delta is not None and self.delta.leaf is not None:
+            return self.delta.leaf
+        return self.base.leaf if self.base is not None else False
+
+    @leaf.setter
+    def leaf(self, value):
+        self.get_delta().leaf = value
+
+    @property
+    def data(self):
+        # reading doesn't create a delta, so the overlay can be read by many threads
+        if self.delta is not None and self.delta.data is not None:
+            return self.delta.data
+        return self.base.data if self.base is not None else {"_": {}}
+
+    @data.setter
+    def data(self, value):
+        self.get_delta().data = value
+
+    def writable_data(self):
+        """
+        :return: the data of the node in its delta, to be modified in place. The data of the base is
+                 copied on the first modification.
+        """
+        delta = self.get_delta()
+        if delta.data is None:
+            delta.data = deepcopy(self.base.data) if self.base is not None else {"_": {}}
+        return delta.data
+
+    @property
+    def children(self):
+        keys = list(self.base.children) if self.base is not None else []
+        if self.delta is not None:
+            keys += [k for k in self.delta.children if k not in keys]
+        return {k: self.get_child(k) for k in keys}
+
+    def add_child(self, key, leaf=False):
+        child = self.get_child(key)
+        if child is None:
+            delta = Delta(leaf=True if leaf else None)
+            self.get_delta().children[key] = delta
+            child = OverlayNode(self.overlay, None, delta, self, key)
+        return child
+
+    def get_child(self, key):
+        base = self.base.get_child(key) if self.base is not None else None
+        delta = self.delta.children.get(key) if self.delta is not None else None
+        if base is None and delta is None:
+            return None
+        return OverlayNode(self.overlay, base, delta, self, key)
+
+    def get_syl_id(self, syl):
+        # the key of the base trie, and the syllable for the deltas
+        return self.overlay.base.get_syl_id(syl), syl
+
+    def get_child_id(self, syl_id):
+        base_id, syl = syl_id
+        base = None
+        if self.base is not None and base_id is not None:
+            base = self.base.get_child_id(base_id)
+        delta = self.delta.children.get(syl) if self.delta is not None else None
+        if base is None and delta is None:
+            return None
+        return OverlayNode(self.overlay, base, delta, self, syl)
+
+    def can_walk(self):
+        return (self.base is not None and self.base.can_walk()) or (
+            self.delta is not None and self.delta.children != {}
+        )
+
+    def is_match(self):
+        return self.leaf
+
+    def __getitem__(self, key):
+        child = self.get_child(key)
+        if child is None:
+            raise KeyError(key)
+        return child
+
+
+class OverlayTrie:
+    """
+    Records the changes made to a trie (added words, data, deactivation) without modifying it.
+
+    The base trie, given by its head (of any node type), is only read, so many overlays can share it.
+    The changes are kept in a sparse tree of ``Delta`` that only holds the nodes that were modified.
+    The head of the overlay, an ``OverlayNode``, is what ``BasicTrie`` manipulates.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.root = Delta()
+        self.head = OverlayNode(self, base, self.root, None, None)
+
+    def copy(self):
+        """
+        :return: a new overlay on the same base, with a copy of the changes
+
+        Reading an overlay doesn't modify it (see ``OverlayNode.data``), so it can be copied while
+        other threads tokenize with it.
+        """
+        overlay = OverlayTrie(self.base)
+        stack = [(self.root, overlay.root)]
+        while stack:
+            src, dst = stack.pop()
+            dst.leaf = src.leaf
+            dst.data = deepcopy(src.data)
+            for key, child in src.children.items():
+                dst.children[key] = Delta()
+                stack.append((child, dst.children[key]))
+        return overlay
@@ -1,44 +1,115 @@
 # coding: utf-8
 import csv
 import pickle
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from itertools import repeat
 from pathlib import Path
 import logging
 
-from ..chunks.chunks import TokChunks
-from ..vars import HASH, NAMCHE, NO_POS, TSEK, __version__
-from .basictrie import BasicTrie, Node
+from ..chunks.chunks import get_syls
+from ..vars import AA, HASH, NAMCHE, NO_POS, TSEK, __version__
+from .basictrie import BasicTrie, copy_trie
+from .compacttrie import CompactNode, CompactTrie
+from .manifest import TrieManifest, iter_data_files
+from .mappedtrie import MappedTrie, convert_pickled_trie, write_mapped_trie
+from .overlaytrie import OverlayNode, OverlayTrie
+
+BACKENDS = ["node", "compact", "mmap"]
+BATCH_SIZE = 2000  # lines sent at once to the processes of a parallel build
 
 
 class Trie(BasicTrie):
     def __init__(
-        self, bosyl, profile, main_data, custom_data, build=False, pickle_path=None
+        self,
+        bosyl,
+        profile,
+        main_data,
+        custom_data,
+        build=False,
+        pickle_path=None,
+        backend="node",
+        processes=1,
+        overlay=False,
+        base=None,
     ):
-        BasicTrie.__init__(self)
+        """
+        :param backend: representation of the trie in memory.
+                        "node": one ``Node`` object per node (default), saved in a pickle file
+                        "compact": flat arrays of a ``CompactTrie``, which uses a fraction of the memory
+                        "mmap": ``MappedTrie`` walked in a memory-mapped file shared by all the processes
+                                that use it.
+                        The compact and mmap backends are saved in the flat format of ``write_mapped_trie()``,
+                        which loads several times faster than a pickle. The file is converted from the pickled
+                        trie if it exists.
+        :param processes: number of processes parsing and inflecting the entries of the dictionary files
+                          when the trie is built. The trie is the same as with a single process.
+        :param overlay: records the custom data in an ``OverlayTrie`` instead of modifying the trie built
+                        from the main data, which can then be shared with other tries (see ``base``)
+        :param base: a ``Trie`` of the same main data, created with ``overlay=True`` or without custom data.
+                     Its trie is shared instead of being loaded, and the custom data is kept in an overlay.
+                     The backend of ``base`` is used.
+        """
+        if backend not in BACKENDS:
+            raise SyntaxError(f"backend should be either one of {BACKENDS}")
+        if base is not None:
+            if not base.overlay and any(iter_data_files(base.custom_data)):
+                raise ValueError("base should be created with overlay=True")
+            backend = base.backend
+            overlay = True
+        self.backend = backend
+        self.overlay = overlay
+        self.base = base
+        self.processes = processes
+        BasicTrie.__init__(self, compact=backend != "node")
         self.bosyl = bosyl()
         self.main_data = main_data
         self.custom_data = custom_data
         self.pickled_file = Path(profile + "_trie.pickled")
         if pickle_path:
             self.pickled_file = Path(pickle_path) / self.pickled_file
+        self.mapped_file = self.pickled_file.with_suffix(".mapped")
+        self.manifest_file = self.pickled_file.with_suffix(".manifest")
+        # the dialect pack, next to the trie files (see ``WordTokenizer``)
+        self.pack_root = self.pickled_file.parent / profile
+        self.manifest = None
         self.tmp_inflected = (
             dict()
         )  # tmp to inflect only once, even if a word appears in many files.
+        self.tmp_syls = dict()
+        self.main_head = None  # head of the trie of the main data
+        self.delta_lock = threading.Lock()
+        self.deltas = 0  # number of calls to apply_delta()
         self.load_or_build_trie(build)
 
     def rebuild_trie(self):
-        self.head = Node()
-        self.load_or_build_trie(build=True)
+        with self.delta_lock:
+            self.head = self.new_head()
+            self.load_or_build_trie(build=True)
+            # the changes of apply_delta() were dropped with the previous trie
+            self.deltas = 0
 
     def load_or_build_trie(self, build=False):
-        if build or not self.pickled_file.exists():
+        if self.base is not None and not build:
+            self.head = self.base.main_head
+            self.manifest = self.base.manifest
+        elif build or not (self.pickled_file.exists() or self.mapped_file.exists()):
             self._build_trie()
-        else:
+        elif self.backend == "node" and self.pickled_file.exists():
             self._load_trie()
+        else:
+            self._load_mapped_trie()
+        self.main_head = self.head
 
         # add and deactivate the custom entries in memory (will not be written)
+        if self.overlay:
+            self.head = OverlayTrie(self.main_head).head
         self._populate_trie(self.custom_data)
         self.tmp_inflected = dict()
+        self.tmp_syls = dict()
 
     def _load_trie(self):
         with self.pickled_file.open("rb") as f:
@@ -48,72 +119,405 @@ class Trie(BasicTrie):
                 print(
                     f"\nThe trie was build for botok {version}. Current version: {__version__}"
                 )
+                self.head = self.new_head()
                 self._build_trie()
+                return
+            elif self.compact != isinstance(self.head, CompactNode):
+                # the pickled trie was built with the other representation
+                self.head = copy_trie(self.head, self.new_head())
+        self._update_trie()
+
+    def _load_mapped_trie(self):
+        if not self.mapped_file.exists():
+            convert_pickled_trie(self.pickled_file, self.mapped_file)
+
+        try:
+            mapped = MappedTrie(self.mapped_file, in_memory=self.backend != "mmap")
+        except IOError as e:
+            print(f"\n{e}")
+            mapped = None
+        if mapped is None or mapped.version != __version__:
+            if mapped is not None:
+                print(
+                    f"\nThe trie was build for botok {mapped.version}. Current version: {__version__}"
+                )
+            self.head = self.new_head()
+            self._build_trie()
+            return
+
+        if self.backend == "mmap":
+            self.head = mapped.head
+        elif self.backend == "compact":
+            self.head = CompactTrie.from_mapped(mapped).head
+        else:
+            self.head = copy_trie(mapped.head, self.new_head())
+        self._update_trie()
 
     def _build_trie(self):
         """
         """
         logging.debug("Building Trie:")
         start = time.time()
-        self.head.data["_"]["version"] = __version__  # add version in trie
-        self._populate_trie(self.main_data)
-
-        with self.pickled_file.open("wb") as f:
-            pickle.dump(self.head, f, pickle.HIGHEST_PROTOCOL)
+        self.head.writable_data()["_"]["version"] = __version__  # add version in trie
+        self.manifest = TrieManifest(version=__version__, root=self.pack_root)
+        self._populate_trie(
+            self.main_data, manifest=self.manifest, processes=self.processes
+        )
+        self._save_trie()
         end = time.time()
         logging.debug("({:.0f} s.)".format(end - start))
 
-    def _populate_trie(self, files):
-        # first populate the trie with words
-        lexica = (d for d in files if d.startswith("lexica"))
-        for l in lexica:
-            for f in files[l]:
-                self._add_one_file(f, l)
+    def _save_trie(self):
+        # ties the saved trie to the manifest: the pickled and the flat files share it
+        digest = self.manifest.digest
+        self.head.writable_data()["_"]["pack_digest"] = digest
+        if self.backend == "node":
+            with self.pickled_file.open("wb") as f:
+                pickle.dump(self.head, f, pickle.HIGHEST_PROTOCOL)
+        else:
+            write_mapped_trie(
+                self.head, self.mapped_file, version=__version__, pack_digest=digest
+            )
+            if self.backend == "mmap":
+                self.head = MappedTrie(self.mapped_file).head
+        self.manifest.save(self.manifest_file)
+
+    def _update_trie(self):
+        """
+        Brings the loaded trie up to date with the content of the dictionary files.
 
-        # then add data to the added words
-        rest = (
-            d for d in files if not d.startswith("lexica") and not d.startswith("rules")
-        )
-        for r in rest:
-            for f in files[r]:
-                self._add_one_file(f, r)
+        The manifest saved with the trie tells which entries were modified, added or removed since it was
+        built. All the inflected forms of the words concerned are reset, then all the entries that modify
+        these forms are replayed in the order they appear in the files.
+        The trie is rebuilt if there is no manifest, if the manifest was saved with another trie file
+        or if the files were reordered.
+        """
+        manifest = TrieManifest.load(self.manifest_file, root=self.pack_root)
+        if manifest and manifest.digest != self.head.data["_"].get("pack_digest"):
+            manifest = None
+        compared = manifest.compare(self.main_data) if manifest else None
+        if not compared:
+            logging.debug("No usable manifest: rebuilding the trie")
+            self.head = self.new_head()
+            self._build_trie()
+            return
 
-    def _add_one_file(self, in_file, category):
+        current, deleted = compared
+        self.manifest = TrieManifest(version=__version__, root=self.pack_root)
+        old_lines, new_lines = defaultdict(list), defaultdict(list)
+        for f in deleted:
+            for line_hash, keys in TrieManifest.iter_entries(f):
+                for key in keys:
+                    old_lines[key].append((f["category"], line_hash))
+
+        read = {}  # (category, path): lines of the files read
+        for category, path, digest in current:
+            previous = manifest.get_file(category, path)
+            if previous and previous["hash"] == digest:
+                self.manifest.add_file(path, category, previous["entries"], digest)
+                continue
+
+            logging.debug("\tupdating " + str(path))
+            # only the keys of the new lines need to be computed
+            known = {}
+            for line_hash, keys in (
+                TrieManifest.iter_entries(previous) if previous else []
+            ):
+                known[line_hash] = keys
+                for key in keys:
+                    old_lines[key].append((category, line_hash))
+            lines = read[category, str(path)] = self._read_lines(path)
+            entries = []
+            for l in lines:
+                line_hash = TrieManifest.hash_line(l)
+                keys = known.get(line_hash)
+                if keys is None:
+                    keys = self._line_keys(l, category)
+                entries.append(TrieManifest.encode_entry(line_hash, keys))
+                for key in keys:
+                    new_lines[key].append((category, line_hash))
+            self.manifest.add_file(path, category, entries, digest)
+
+        changed = {
+            k for k in set(old_lines) | set(new_lines) if old_lines[k] != new_lines[k]
+        }
+        if not changed and not deleted:
+            return
+
+        # find all the words sharing inflected forms with the changed ones
+        index = {
+            key
+            for f in self.manifest.files
+            for _, keys in TrieManifest.iter_entries(f)
+            for key in keys
+        }
+        to_replay, forms = set(changed), set()
+        queue = list(changed)
+        while queue:
+            inflected = self._get_inflected(queue.pop())
+            for infl, _ in inflected if inflected else []:
+                if tuple(infl) in forms:
+                    continue
+                forms.add(tuple(infl))
+                for key in self._get_uninflected(infl):
+                    if key in index and key not in to_replay:
+                        to_replay.add(key)
+                        queue.append(key)
+
+        for form in forms:
+            self.reset(form)
+        # the manifest only has hashes: the lines are read back from the files
+        for (category, path, _), f in zip(current, self.manifest.files):
+            keys = [keys for _, keys in TrieManifest.iter_entries(f)]
+            if not any(to_replay.intersection(k) for k in keys):
+                continue
+            lines = read.get((category, str(path)))
+            if lines is None:
+                lines = self._read_lines(path)
+            for l, k in zip(lines, keys):
+                if to_replay.intersection(k):
+                    self._add_one_line(l, category)
+        self.tmp_inflected = dict()
+        self.tmp_syls = dict()
+        self._save_trie()
+
+    def apply_delta(self, words=None, remove=None):
+        """
+        Modifies entries of the trie in memory, without rebuilding it.
+
+        The changes are made in a new ``OverlayTrie`` (a copy of the current one if the trie already is an
+        overlay), which then replaces the head of the trie in a single assignment. Tokenization running
+        meanwhile in other threads keeps using the previous version of the trie.
+        The changes are not saved: the dictionary files should be updated as well.
+
+        :param words: lines in the format of the files in "words". The senses of these words
+                      (and of their inflected forms) are replaced by the ones of the lines.
+        :param remove: words to remove
+        """
+        with self.delta_lock:
+            if isinstance(self.head, OverlayNode):
+                overlay = self.head.overlay.copy()
+            else:
+                overlay = OverlayTrie(self.head)
+
+            updated = copy(self)
+            updated.head = overlay.head
+            updated.tmp_inflected, updated.tmp_syls = dict(), dict()
+
+            words = words if words else []
+            for form in dict.fromkeys(l.split("\t", 1)[0] for l in words):
+                updated._remove_senses(form)
+            for l in words:
+                updated._add_one_line(l, "words")
+            for l in remove if remove else []:
+                updated._add_one_line(l, "remove")
+
+            self.head = updated.head
+            self.deltas += 1
+
+    def _remove_senses(self, word):
+        """
+        Removes the senses added by the lines of ``word`` from its inflected forms.
+
+        An inflected form can also be the form of another word (the affixed "བཀྲས" of "བཀྲ" and the
+        word "བཀྲས"), so only the senses of ``word`` are removed: the ones that are not affixed on its
+        own node, found affixed on its inflected forms.
+        """
+        inflected = self._get_inflected(word)
+        if not inflected:
+            return
+        node = self._get_node(inflected[0][0])
+        if node is None or "senses" not in node.data:
+            return
+        own = [s for s in node.data["senses"] if not s.get("affixed")]
+        for infl, affixation in inflected:
+            node = self._get_node(infl)
+            if node is None or "senses" not in node.data:
+                continue
+            removed = [dict(s, affixed=True) for s in own] if affixation else own
+            data = node.writable_data()
+            data["senses"] = [s for s in data["senses"] if s not in removed]
+            if not data["senses"]:
+                del data["senses"]
+
+    def _get_node(self, word):
+        current_node = self.head
+        for syl in word:
+            current_node = current_node.get_child(syl)
+            if current_node is None:
+                return None
+        return current_node
+
+    def reset(self, word):
+        """Makes a word not findable and deletes all its data."""
+        current_node = self._get_node(word)
+        if current_node is None:
+            return False
+        current_node.leaf = False
+        current_node.data = {"_": {}}
+        return True
+
+    def _populate_trie(self, files, manifest=None, processes=1):
+        # words are added, data is added to them, then words are removed in the order of the files
+        if processes > 1:
+            self._populate_trie_parallel(files, manifest, processes)
+            return
+
+        for category, f in iter_data_files(files):
+            lines = self._add_one_file(f, category)
+            if manifest is not None:
+                manifest.add_file(f, category, self._entries(lines, category))
+
+    def _populate_trie_parallel(self, files, manifest, processes):
+        """
+        The lines of the files are split in batches whose syllables and inflected forms are computed
+        by a pool of processes. The main process then fills its caches with them and adds the lines
+        to the trie in the order of the files, exactly as ``_add_one_file()`` does.
+        """
+        batches = []
+        for category, f in iter_data_files(files):
+            lines = self._read_lines(f)
+            for i in range(0, len(lines), BATCH_SIZE):
+                batches.append((category, f, lines[i : i + BATCH_SIZE]))
+
+        entries = defaultdict(list)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            prepared = pool.map(
+                self._prepare_lines,
+                repeat(type(self.bosyl)),
+                [lines for _, _, lines in batches],
+                [category for category, _, _ in batches],
+            )
+            for (category, f, lines), (inflected, syls) in zip(batches, prepared):
+                logging.debug("\t" + str(f))
+                for word, infl in inflected.items():
+                    self.tmp_inflected.setdefault(word, infl)
+                for string, s in syls.items():
+                    self.tmp_syls.setdefault(string, s)
+                for l in lines:
+                    self._add_one_line(l, category)
+                if manifest is not None:
+                    entries[category, f].extend(self._entries(lines, category))
+
+        if manifest is not None:
+            for category, f in iter_data_files(files):
+                manifest.add_file(f, category, entries[category, f])
+
+    @staticmethod
+    def _prepare_lines(bosyl, lines, category):
+        """
+        Runs in the processes of a parallel build.
+
+        :return: the inflected forms of all the words found in the lines and
+                 the syllables of the lemmas and of the non-inflected words
+        """
+        bosyl = bosyl()
+        inflected, syls = {}, {}
+        for l in lines:
+            if category == "remove":
+                words = [l]
+            else:
+                word = l.split("\t", 1)[0]
+                form, _, lemma, _, _ = Trie.__parse_line(l)
+                words = [word, form]
+                if category == "words_non_inflected":
+                    syls[word] = get_syls(word)
+                if lemma:
+                    syls[lemma] = get_syls(lemma)
+
+            for word in words:
+                if word and word not in inflected:
+                    infl = Trie._inflect(bosyl, word)
+                    if infl:
+                        inflected[word] = infl
+        return inflected, syls
+
+    def _read_lines(self, in_file):
         """
         files can have comments starting with #
         spaces and empty lines are trimmed
+        """
+        with in_file.open("r", encoding="utf-8-sig") as f:
+            return list(self.__clean_lines(f))
+
+    def _add_one_file(self, in_file, category):
+        """
         a single space(breaks if more than one), a comma or a tab can be used as separators
+
+        :return: the lines that were added
         """
         logging.debug("\t" + str(in_file))
-        with in_file.open("r", encoding="utf-8-sig") as f:
-            lines = self.__clean_lines(f)
-            for l in lines:
-                word = l.split("\t", 1)[0]
-                if category == "words":
-                    self.inflect_n_modify_trie(word)
-                    self.inflect_n_add_data(l)
+        lines = self._read_lines(in_file)
+        for l in lines:
+            self._add_one_line(l, category)
+        return lines
 
-                elif category == "words_non_inflected":
-                    self.add_non_inflectible(word)
-                    self.inflect_n_add_data(l)
+    def _add_one_line(self, l, category):
+        word = l.split("\t", 1)[0]
+        if category == "words":
+            self.inflect_n_modify_trie(word)
+            self.inflect_n_add_data(l)
 
-                elif category == "words_skrt":
-                    self.inflect_n_modify_trie(word, skrt=True)
-                    self.inflect_n_add_data(l)
+        elif category == "words_non_inflected":
+            self.add_non_inflectible(word)
+            self.inflect_n_add_data(l)
 
-                elif category == "remove":
-                    self.inflect_n_modify_trie(l, deactivate=True)
+        elif category == "words_skrt":
+            self.inflect_n_modify_trie(word, skrt=True)
+            self.inflect_n_add_data(l)
 
-                else:
-                    raise SyntaxError(
-                        "'category' is: '"
-                        + category
-                        + "'. Valid answers: words_bo, words_skrt,"
-                        "words_non_inflected, entry_data, remove"
-                    )
+        elif category == "remove":
+            self.inflect_n_modify_trie(l, deactivate=True)
+
+        else:
+            raise SyntaxError(
+                "'category' is: '"
+                + category
+                + "'. Valid answers: words_bo, words_skrt,"
+                "words_non_inflected, entry_data, remove"
+            )
+
+    def _line_keys(self, line, category):
+        """
+        :return: the keys (syllables joined with tseks) of the words modified by a line of a dictionary file
+        """
+        if category == "remove":
+            words = [line]
+        else:
+            words = [line.split("\t", 1)[0], self.__parse_line(line)[0]]
+
+        keys = []
+        for word in words:
+            inflected = self._get_inflected(word) if word else None
+            if inflected and TSEK.join(inflected[0][0]) not in keys:
+                keys.append(TSEK.join(inflected[0][0]))
+        return keys
+
+    def _entries(self, lines, category):
+        """:return: the entries of the lines of a file, as recorded in the manifest"""
+        return [
+            TrieManifest.encode_entry(
+                TrieManifest.hash_line(l), self._line_keys(l, category)
+            )
+            for l in lines
+        ]
+
+    def _get_uninflected(self, inflected):
+        """
+        :param inflected: list of syllables
+        :return: the keys of all the words that can have ``inflected`` as one of their inflected forms
+        """
+        keys = {TSEK.join(inflected)}
+        last = inflected[-1]
+        for affix in self.bosyl.affixes:
+            if len(last) > len(affix) and last.endswith(affix):
+                stem = last[: -len(affix)]
+                for syl in [stem, stem + AA]:
+                    keys.add(TSEK.join(inflected[:-1] + [syl]))
+        return keys
 
     def add_non_inflectible(self, word):
-        syls = TokChunks(word).get_syls()
+        syls = self._get_syls(word)
         if not syls:
             return None
 
@@ -146,7 +550,7 @@ class Trie(BasicTrie):
     def inflect_n_add_data(self, line):
         form, pos, lemma, sense, freq = self.__parse_line(line)
         freq = int(freq) if freq else None
-        lemma = self.__join_syls(TokChunks(lemma).get_syls()) if lemma else None
+        lemma = self.__join_syls(self._get_syls(lemma)) if lemma else None
 
         inflected = self._get_inflected(form)
         if not inflected:
@@ -169,27 +573,37 @@ class Trie(BasicTrie):
 
     def _get_inflected(self, word):
         """
-        gets the clean syls using TokChunks(), then inflects the last syl using BoSyl.get_all_affixed()
+        gets the clean syls using get_syls(), then inflects the last syl using BoSyl.get_all_affixed()
 
         :return: list of (<inflected word>, <affixation data>)
         """
         if word in self.tmp_inflected:
             return self.tmp_inflected[word]
 
-        syls = TokChunks(word).get_syls()
+        inflected = self._inflect(self.bosyl, word)
+        if inflected:
+            self.tmp_inflected[word] = inflected
+        return inflected
+
+    @staticmethod
+    def _inflect(bosyl, word):
+        syls = get_syls(word)
         if not syls:
             return None
 
         inflected = [(syls, None)]
-        affixed = self.bosyl.get_all_affixed(syls[-1])
+        affixed = bosyl.get_all_affixed(syls[-1])
         if affixed:
             for infl, data in affixed:
                 infl_word = syls[:-1] + [infl]
                 inflected.append((infl_word, {"affixation": data}))
-
-        self.tmp_inflected[word] = inflected
         return inflected
 
+    def _get_syls(self, string):
+        if string not in self.tmp_syls:
+            self.tmp_syls[string] = get_syls(string)
+        return self.tmp_syls[string]
+
     @staticmethod
     def __join_syls(syls):
         return "".join([syl if syl.endswith(NAMCHE) else syl + TSEK for syl in syls])
@@ -1,5 +1,12 @@
 # coding: utf8
+import random
+import warnings
+from pathlib import Path
+
+import pytest
+
 from botok import Chunks, TokChunks, TSEK
+from botok.chunks.chunks import get_syls
 
 string = (
     '༆ བཀྲ་ཤིས་བདེ་ལེགས།། །། 23PIEIUZLDVéjoldvép«»("«»%= ༪༫༝༜༛༚༇༆ ༡༢༣༠༩༨ '
@@ -72,3 +79,179 @@ def test_tokchunks():
         "".join([string[c] for c in chars]) + TSEK for chars, chunk in chunks if chars
     ]
     assert chunks == ["བཀྲ་", "ཤིས་", "བདེ་", "ལེགས་"]
+
+
+def test_syl_vocab():
+    c = TokChunks("བཀྲ་ཤིས་ཤིས། བཀྲ་ཤིས་abc")
+    c.serve_syls_to_trie()
+    assert c.vocab == ["བཀྲ", "ཤིས"]
+    assert c.syl_ids == [0, 1, 1, None, 0, 1, None]
+    assert len(c.syl_ids) == len(c.chunks)
+
+
+def test_set_chunks(rules_wt):
+    c = TokChunks("བཀྲ་ཤིས་བཀྲ་")
+    c.serve_syls_to_trie()
+    first, second, third = c.chunks
+
+    # custom pipelines can replace the chunks: the arrays of the tokenizer follow
+    c.chunks = [first, third]
+    assert c.chunks == [first, third]
+    assert c.spans == [first[1], third[1]]
+    assert c.vocab == ["བཀྲ"] and c.syl_ids == [0, 0]
+    assert c.get_syl_chars(1) == third[0]
+    tokens = rules_wt.tok.tokenize(c)
+    assert [(t.start, t.len) for t in tokens] == [(0, 4), (8, 4)]
+
+
+def test_single_pass():
+    strings = [
+        string,
+        "ཀ ཁ ག ཤི བ ཀ་",
+        "་ཀ་ཁ",
+        "ༀ་པ་ཊུ་",
+        "a \x01 就 ༄",
+        "༌་ \nཀ就",
+        Path("tests/resources/test_file_to_tokenize.txt").read_text(encoding="utf-8"),
+    ]
+    # random strings of chars of every category
+    rnd = random.Random(0)
+    chars = "ཀགཤབྲྐིེུ་་་།༄༁༡༓ༀ༵ཫཊཱྀཿ就a  \n\x01"
+    strings += [
+        "".join(rnd.choice(chars) for _ in range(rnd.randint(0, 40)))
+        for _ in range(500)
+    ]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for s in strings:
+            for space_as_punct in [False, True]:
+                expected = Chunks(s).make_chunks(space_as_punct=space_as_punct)
+                chunks = Chunks(s, engine="single_pass").make_chunks(
+                    space_as_punct=space_as_punct
+                )
+                assert chunks == expected, s
+
+    c = TokChunks(string, engine="single_pass")
+    c.serve_syls_to_trie()
+    expected = TokChunks(string)
+    expected.serve_syls_to_trie()
+    assert c.chunks == expected.chunks
+    with pytest.raises(SyntaxError):
+        Chunks(string, engine="regex")
+
+
+def test_leading_skippable_punct():
+    # a leading tsek and space are merged into the first syllable, which starts after the tsek.
+    # The merged chunk used to be one char too long, overlapping the next chunk: (104, 1, 6)
+    for engine in ["pipeline", "single_pass"]:
+        chunks = Chunks("་ བཀྲ་ཤིས་ བདེ་ལེགས།", engine=engine).make_chunks()
+        assert chunks == [
+            (104, 1, 5),
+            (104, 6, 5),
+            (104, 11, 4),
+            (104, 15, 4),
+            (105, 19, 1),
+        ]
+        # and raised an IndexError when it went past the end of the string
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            assert Chunks("་ཿ ༵ྐེ\n", engine=engine).make_chunks() == [(104, 2, 5)]
+
+
+def test_stream():
+    text = string + " ཀ ཁ་ཀ་" + string * 3
+    expected = TokChunks(text)
+    expected.serve_syls_to_trie()
+
+    pieces = [text[i : i + 7] for i in range(0, len(text), 7)]
+    assert list(TokChunks.stream(pieces, window=20)) == expected.chunks
+
+    windows = list(TokChunks.iter_windows(pieces, window=20))
+    assert len(windows) > 1
+    offset = 0
+    for w in windows:
+        assert w.offset == offset
+        last = w.chunks[-1][1]
+        offset += last[1] + last[2]
+        assert text[w.offset : offset] == w.bs.string[: last[1] + last[2]]
+    assert offset == len(text)
+
+
+def test_stream_without_syllables():
+    # a long text without any safe cut is not held completely
+    text = "abc def, 123. " * 500 + string
+    pieces = [text[i : i + 7] for i in range(0, len(text), 7)]
+    windows = list(TokChunks.iter_windows(pieces, window=50))
+    assert len(windows) > 100
+    assert all(w.bs.len <= 2 * 50 + 7 for w in windows)
+    assert "".join(
+        w.bs.string[: w.spans[-1][1] + w.spans[-1][2]] for w in windows
+    ) == text
+
+    # the Tibetan text that follows is chunked as in the whole text
+    expected = TokChunks(text)
+    expected.serve_syls_to_trie()
+    chunks = list(TokChunks.stream(pieces, window=50))
+    n = len(TokChunks(string).make_chunks())
+    assert chunks[-n:] == expected.chunks[-n:]
+
+
+def test_find_punct_cuts():
+    text = "བཀྲ་ཤིས་བདེ་ལེགས། ཀ་ཁ་ག་ང་ཅ་ཆ། " * 20
+    cuts = TokChunks.find_punct_cuts(text, 40, window=30)
+    assert cuts[0] == 0 and len(cuts) > 5
+    for prev, cut in zip(cuts, cuts[1:]):
+        # after the space following a shad, at least 40 chars after the previous cut
+        assert text[cut - 2 : cut] == "། "
+        assert cut - prev >= 40
+
+    # no punctuation: no cut
+    assert TokChunks.find_punct_cuts("ཀ་" * 100, 20, window=30) == [0]
+
+
+def test_numpy_engine():
+    pytest.importorskip("numpy")
+    strings = [
+        "",
+        string,
+        "ཀ ཁ ག ཤི བ ཀ་",
+        "་ཀ་ཁ",
+        "a \x01 就 ༄",
+        Path("tests/resources/test_file_to_tokenize.txt").read_text(encoding="utf-8"),
+    ]
+    rnd = random.Random(1)
+    chars = "ཀགཤབྲྐིེུ་་་།༄༁༡༓ༀ༵ཫཊཱྀཿ就a  \n\x01"
+    strings += [
+        "".join(rnd.choice(chars) for _ in range(rnd.randint(0, 40)))
+        for _ in range(500)
+    ]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for s in strings:
+            for space_as_punct in [False, True]:
+                expected = Chunks(s).make_chunks(space_as_punct=space_as_punct)
+                chunks = Chunks(s, engine="numpy").make_chunks(
+                    space_as_punct=space_as_punct
+                )
+                assert chunks == expected, s
+
+
+def test_get_syls():
+    words = ["བཀྲ་ཤིས་", "བཀྲ་ཤིས", "ཀ་༌ཁ", "་ཀ་", "ཀ་་ཁ", "བཀྲ་ ཤིས།", "ཀཿ", "ཨོཾ་", "abc", ""]
+    for word in words:
+        assert get_syls(word) == TokChunks(word).get_syls(), word
+    assert get_syls("བཀྲ་ཤིས་") == ["བཀྲ", "ཤིས"]
+
+
+def test_syl_arrays():
+    c = TokChunks("་ བཀྲ་ཤིས་ ཀ ཁ་ཀཿ། abc")
+    c.serve_syls_to_trie()
+    assert len(c.spans) == len(c.syl_ids) == len(c.syl_offsets) - 1
+    for i, (syl, chunk) in enumerate(c.chunks):
+        assert chunk == c.spans[i]
+        assert syl == c.get_syl_chars(i)
+        if syl is not None:
+            cleaned = "".join(c.bs.string[j] for j in syl)
+            assert cleaned == c.vocab[c.syl_ids[i]]
+            assert "་" not in cleaned and " " not in cleaned
+    assert c.syl_chars.tolist() == [j for syl, _ in c.chunks if syl for j in syl]
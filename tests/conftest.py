@@ -1,3 +1,5 @@
+import shutil
+
 import pytest
 
 from botok import Config, Tokenize, WordTokenizer
@@ -14,3 +16,36 @@ def empty_wt():
 def wt():
     """Return default word tokenizer."""
     return WordTokenizer()
+
+
+@pytest.fixture
+def make_pack(tmp_path):
+    """
+    Return a function making a copy of the trie dialect pack, with the given lines in its dictionary.
+    The copy is made in ``path``, "POS" in tmp_path by default.
+    """
+
+    def make(lines, path=None):
+        pack = path if path else tmp_path / "POS"
+        shutil.copytree("./tests/data/trie_dialect_pack", pack)
+        (pack / "dictionary" / "words" / "empty.tsv").write_text(
+            "".join(f"{line}\n" for line in lines), encoding="utf-8"
+        )
+        return pack
+
+    return make
+
+
+@pytest.fixture
+def rules_pack(make_pack):
+    """
+    Return a copy of the trie dialect pack, with words in its dictionary.
+    Its adjustment rules replace, split and merge the tokens of "ལ་ལ་ལ་ལ་".
+    """
+    return make_pack(["བཀྲ་ཤིས\tNOUN", "མཐའ\tNOUN", "རྒྱལ་པོ\tNOUN", "ལ་ལ\tNOUN"])
+
+
+@pytest.fixture
+def rules_wt(rules_pack):
+    """Return word tokenizer of rules_pack."""
+    return WordTokenizer(config=Config.from_path(rules_pack))
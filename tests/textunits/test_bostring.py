@@ -1,6 +1,8 @@
 # coding: utf8
 import warnings
 
+import pytest
+
 from botok import BoString
 from botok import CharMarkers as m
 
@@ -44,3 +46,60 @@ def test_warning():
             str(w[0].message)
             == 'Beware of unexpected results: input string contains the non-expanded char "ༀ", found in "ༀ་པ་ཊུ".'
         )
+
+
+def test_category_table():
+    from botok.textunits.charcategories import UNKNOWN, get_categories, get_char_category
+
+    chars = [chr(i) for i in range(0x10000)] + ["\U00020001", "\U0001f600"]
+    expected = []
+    for char in chars:
+        try:
+            expected.append(get_char_category(char))
+        except ValueError:
+            expected.append(UNKNOWN)
+    assert list(get_categories("".join(chars))) == expected
+
+    bs = BoString("བཀྲ་ཤིས་ tr", ignore_chars=["t"])
+    assert bs.base_structure[9] == m.TRANSPARENT
+    assert bs.base_structure[10] == m.LATIN
+    with pytest.raises(ValueError):
+        BoString("ཀ཭")
+
+
+def test_export_groups():
+    bs = BoString(" བཀྲ་ཤིས་  tr བདེ་ལེགས།")
+    assert isinstance(bs.base_structure, bytearray)
+    assert list(bs.export_view(2, 5)) == [1, 2, 4, 1, 3]
+    assert bs.export_groups(2, 5) == {0: 1, 1: 2, 2: 4, 3: 1, 4: 3}
+    assert bs.export_groups(2, 5, for_substring=False) == {2: 1, 3: 2, 4: 4, 5: 1, 6: 3}
+    assert bs.get_categories(bs.export_view(2, 2)) == {0: "CONS", 1: "SUB_CONS"}
+
+
+def test_nfc_diagnostic():
+    from botok import NfcWarning
+
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        bs = BoString("ༀ་\u0f43་ཀ་\u0f43་" * 20)
+    assert len(w) == 1
+    assert w[0].category is NfcWarning
+    assert bs.nfc is w[0].message
+    assert bs.nfc.count == 60
+    assert bs.nfc.chars == {"ༀ": 20, "\u0f43": 40}
+    assert bs.nfc.positions == [0, 2, 6, 8, 10, 14, 16, 18, 22, 24]
+    assert str(bs.nfc).startswith(
+        'Beware of unexpected results: input string contains 60 non-expanded chars ("\u0f43": 40, "ༀ": 20)'
+    )
+
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        bs = BoString("ༀ་\u0f43་ཀ་\u0f43་", expand_nfc=True)
+    assert bs.string == "ༀ་\u0f42\u0fb7་ཀ་\u0f42\u0fb7་"
+    assert bs.len == 10
+    assert bs.nfc.count == 1
+    assert str(w[0].message).endswith('char "ༀ", found in "ༀ་\u0f42\u0fb7་ཀ་\u0f42\u0fb7".')
+    # only the canonical expansions are used
+    with pytest.warns(NfcWarning):
+        assert BoString("\u0f77", expand_nfc=True).string == "\u0f77"
+    assert BoString("ཀ་").nfc is None
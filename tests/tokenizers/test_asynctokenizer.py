@@ -0,0 +1,128 @@
+# coding: utf8
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from botok import AsyncWordTokenizer
+
+
+STRINGS = [f"བཀྲ་ཤིས་པ་ {i} མཐའི་རྒྱ་མཚོ། ལ་ལ་ལ་ལ་" for i in range(40)]
+
+
+def as_pairs(tokens):
+    return [(t.text, t.pos) for t in tokens]
+
+
+def test_async_tokenizer(rules_wt):
+    expected = [as_pairs(rules_wt.tokenize(s)) for s in STRINGS]
+
+    async def run():
+        async with AsyncWordTokenizer(rules_wt, workers=2, batch_size=8) as atok:
+            batches = []
+            tokenize_batch = atok._tokenize_batch
+
+            def count_batches(strings, method, kwargs):
+                batches.append(len(strings))
+                return tokenize_batch(strings, method, kwargs)
+
+            atok._tokenize_batch = count_batches
+            results = await asyncio.gather(*[atok.tokenize(s) for s in STRINGS])
+            bounds = await atok.segment(STRINGS[0], split_affixes=False)
+        # the concurrent requests were batched
+        assert batches == [8, 8, 8, 8, 8, 1]
+        return results, bounds
+
+    results, bounds = asyncio.run(run())
+    assert [as_pairs(tokens) for tokens in results] == expected
+    assert bounds == rules_wt.segment(STRINGS[0], split_affixes=False)
+
+    with pytest.raises(ValueError):
+        AsyncWordTokenizer(rules_wt, executor="fibers")
+
+
+def test_async_backpressure_and_cancellation(rules_wt):
+    async def run():
+        atok = AsyncWordTokenizer(rules_wt, workers=1, max_pending=4, batch_delay=0.05)
+        tasks = [asyncio.ensure_future(atok.tokenize(s)) for s in STRINGS[:10]]
+        await asyncio.sleep(0.01)
+        # only max_pending requests are waiting for their batch
+        assert len(atok._batches) == 1
+        assert len(next(iter(atok._batches.values()))[0]) == 4
+
+        # cancelled before its batch is sent: not tokenized
+        tasks[0].cancel()
+        results = await asyncio.gather(*tasks[1:])
+        assert tasks[0].cancelled()
+        await atok.close()
+        with pytest.raises(RuntimeError):
+            await atok.tokenize(STRINGS[0])
+        return results
+
+    results = asyncio.run(run())
+    assert [as_pairs(r) for r in results] == [
+        as_pairs(rules_wt.tokenize(s)) for s in STRINGS[1:10]
+    ]
+
+
+@pytest.mark.parametrize("mp_context", [None, "spawn"])
+def test_async_process_executor(rules_wt, mp_context):
+    async def run():
+        async with AsyncWordTokenizer(
+            rules_wt, executor="process", workers=2, mp_context=mp_context
+        ) as atok:
+            return await asyncio.gather(*[atok.segment(s) for s in STRINGS])
+
+    assert asyncio.run(run()) == [rules_wt.segment(s) for s in STRINGS]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_async_errors(rules_wt, executor):
+    # "཭" is not a Tibetan char: tokenizing it raises a ValueError
+    strings = ["ལ་ལ་", "ཀ཭་", "བཀྲ་ཤིས་"]
+
+    async def run():
+        async with AsyncWordTokenizer(rules_wt, executor=executor, workers=1) as atok:
+            return await asyncio.gather(
+                *[atok.tokenize(s) for s in strings], return_exceptions=True
+            )
+
+    good, bad, other = asyncio.run(run())
+    # the batch holding all three strings only failed the bad one
+    assert isinstance(bad, ValueError)
+    assert as_pairs(good) == as_pairs(rules_wt.tokenize(strings[0]))
+    assert as_pairs(other) == as_pairs(rules_wt.tokenize(strings[2]))
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_async_worker_crash(rules_wt):
+    # the workers are forked, so they inherit the patched method
+    tokenize = rules_wt.tokenize
+
+    def crash(string, **kwargs):
+        if string == "crash":
+            os._exit(1)
+        return tokenize(string, **kwargs)
+
+    rules_wt.tokenize = crash
+
+    async def run():
+        async with AsyncWordTokenizer(
+            rules_wt, executor="process", workers=1, mp_context="fork"
+        ) as atok:
+            broken = atok.executor
+            with pytest.raises(BrokenProcessPool):
+                await atok.tokenize("crash")
+            # the pool was replaced: the following requests are tokenized
+            results = await asyncio.wait_for(
+                asyncio.gather(*[atok.tokenize(s) for s in STRINGS[:3]]), 30
+            )
+            assert atok.executor is not broken
+            return results
+
+    results = asyncio.run(run())
+    assert [as_pairs(r) for r in results] == [as_pairs(tokenize(s)) for s in STRINGS[:3]]
@@ -0,0 +1,107 @@
+# coding: utf8
+import threading
+
+import pytest
+
+from botok import Config, TokenizerRegistry, WordTokenizer
+from botok.tokenizers import registry as registry_module
+
+
+@pytest.fixture
+def packs(tmp_path, make_pack):
+    pack = make_pack(["བཀྲ་ཤིས\tNOUN"])
+    custom = make_pack(["བཀྲ་ཤིས\tNOUN"], tmp_path / "custom" / "POS")
+    (custom / "adjustments" / "words" / "test.tsv").write_text(
+        "ཀྱཱ་ཧ\tINTJ\n", encoding="utf-8"
+    )
+    return pack, custom
+
+
+def test_registry(packs):
+    pack, custom = packs
+    registry = TokenizerRegistry()
+
+    # equal configs share a tokenizer
+    tok = registry.acquire(Config.from_path(pack))
+    assert registry.acquire(Config.from_path(pack)) is tok
+    assert registry.references(Config.from_path(pack)) == 2
+    assert registry.get(Config.from_path(pack)) is tok
+    assert len(registry) == 1
+
+    # other adjustments: another tokenizer, sharing the trie of the dictionary
+    other = registry.acquire(Config.from_path(custom))
+    assert other is not tok
+    assert len(registry) == 2
+    assert [t.text for t in other.tokenize("ཀྱཱ་ཧ་")] == ["ཀྱཱ་ཧ་"]
+    assert [t.text for t in tok.tokenize("ཀྱཱ་ཧ་")] == ["ཀྱཱ་", "ཧ་"]
+
+    # only the tokenizers that are not referenced are evicted
+    registry.release(other)
+    assert registry.evict() == 1
+    assert Config.from_path(custom) not in registry
+    registry.release(tok)
+    assert registry.evict(Config.from_path(pack)) == 0
+    registry.release(tok)
+    with pytest.raises(ValueError):
+        registry.release(tok)
+    assert registry.evict(Config.from_path(pack)) == 1
+    assert len(registry) == 0 and registry.bases == {}
+
+
+def test_registry_content_hash(packs):
+    pack, _ = packs
+    registry = TokenizerRegistry()
+    tok = registry.get(Config.from_path(pack))
+
+    # a modified pack gets a new tokenizer
+    (pack / "adjustments" / "words" / "test.tsv").write_text(
+        "ཀྱཱ་ཧ\tINTJ\n", encoding="utf-8"
+    )
+    new = registry.get(Config.from_path(pack))
+    assert new is not tok
+    # the tokenizer of the previous content is dropped
+    assert len(registry) == 1
+    assert registry.get(Config.from_path(pack)) is new
+
+    # unless it is referenced
+    acquired = registry.acquire(Config.from_path(pack))
+    (pack / "adjustments" / "words" / "test.tsv").write_text("", encoding="utf-8")
+    assert registry.get(Config.from_path(pack)) is not acquired
+    assert len(registry) == 2
+    registry.release(acquired)
+    assert registry.evict() == 2 and registry.bases == {}
+
+
+def test_registry_builds_outside_lock(packs, tmp_path, make_pack, monkeypatch):
+    pack, _ = packs
+    other = make_pack(["མཐའ\tNOUN"], tmp_path / "other" / "POS")
+    registry = TokenizerRegistry()
+    cached = registry.get(Config.from_path(other))
+
+    created = []
+    started, resume = threading.Event(), threading.Event()
+
+    def slow_tokenizer(config, **kwargs):
+        created.append(config.dialect_pack_path)
+        started.set()
+        assert resume.wait(10)
+        return WordTokenizer(config=config, **kwargs)
+
+    monkeypatch.setattr(registry_module, "WordTokenizer", slow_tokenizer)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get(Config.from_path(pack))))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    assert started.wait(10)
+    # while a tokenizer is created, the others are served
+    assert registry.get(Config.from_path(other)) is cached
+    resume.set()
+    for t in threads:
+        t.join()
+
+    # the tokenizer was created once, for all the threads requesting it
+    assert len(created) == 1
+    assert len(results) == 3 and all(r is results[0] for r in results)
@@ -1,4 +1,6 @@
 # coding: utf8
+import pickle
+from copy import deepcopy
 from textwrap import dedent
 from pytest import raises
 
@@ -30,3 +32,39 @@ def test_token():
     # raises an error when trying to add a new attribute
     with raises(AttributeError, match=r"Token objects don't have .* as attribute"):
         t["non_attr"] = "test"
+
+
+def test_lazy_token():
+    config = Config.from_path("./tests/data/empty_dialect_pack")
+    tok = Tokenize(Trie(BoSyl, "empty", config.dictionary, config.adjustments))
+    tok.trie.inflect_n_modify_trie("བཀྲ་ཤིས་")
+    preproc = TokChunks("བཀྲ་ཤིས་ཀྵ། abc")
+    preproc.serve_syls_to_trie()
+    tokens = tok.tokenize(preproc)
+    assert not hasattr(tokens[0], "__dict__")
+
+    # the lazy attributes are computed from the chunks on first access
+    t = tokens[0]
+    assert t._syls_idx is ...
+    assert t.syls_idx == [[0, 1, 2], [4, 5, 6]]
+    assert t.syls_start_end == [{"start": 0, "end": 4}, {"start": 4, "end": 8}]
+    assert t.char_types[:4] == ["CONS", "CONS", "SUB_CONS", "TSEK"]
+    assert t["skrt"] is False and tokens[1].skrt is True
+    assert tokens[2].text == "། " and tokens[2].syls_idx is None
+    # the chunks of the document are released once all of them are known
+    assert t._source is None and tokens[1]._source is not None
+
+    # the copies share the chunks, the pickled tokens hold the computed values
+    copied = deepcopy(tokens[1])
+    assert copied._source[0] is preproc
+    copied.syls_idx.append([2])
+    assert tokens[1].syls_idx == [[0, 1]]
+    unpickled = pickle.loads(pickle.dumps(tokens[1]))
+    assert unpickled._source is None
+    assert unpickled.syls == [["ཀ", "ྵ"]] and unpickled.skrt is True
+
+    # set values are not computed
+    t = tokens[3]
+    t["skrt"] = True
+    t.syls_idx = None
+    assert t.skrt is True and t.syls_idx is None and t.char_types == ["LATIN"] * 3
@@ -1,6 +1,12 @@
 # coding: utf8
+import multiprocessing
+import os
+import threading
+import warnings
 from textwrap import dedent
 
+import pytest
+
 from botok import *
 
 
@@ -130,4 +136,178 @@ def test_spaces_as_punct(wt):
 def test_particle_bug(wt):
     input_str = "བོད་གིས"
     tokens = wt.tokenize(input_str)
-    assert tokens[1].pos == "PART"
\ No newline at end of file
+    assert tokens[1].pos == "PART"
+
+
+def test_tokenize_expand_nfc(rules_wt):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", NfcWarning)
+        tokens = rules_wt.tokenize("བཀྲ་ཤིས་\u0f43་", expand_nfc=True)
+    assert [t.text for t in tokens] == ["བཀྲ་ཤིས་", "\u0f42\u0fb7་"]
+    assert tokens[1].start == 8
+
+    with pytest.warns(NfcWarning):
+        tokens = rules_wt.tokenize("བཀྲ་ཤིས་\u0f43་")
+    assert tokens[1].text == "\u0f43་"
+
+
+def test_apply_delta(rules_wt):
+    wt = rules_wt
+    before = wt.tok.trie.head
+
+    wt.apply_delta(words=["ཀྱཱ་ཧ\tINTJ", "བཀྲ་ཤིས\tADJ"])
+    assert [t.text for t in wt.tokenize("ཀྱཱ་ཧ་")] == ["ཀྱཱ་ཧ་"]
+    # the senses of existing words are replaced
+    tokens = wt.tokenize("བཀྲ་ཤིས་")
+    assert [s["pos"] for s in tokens[0].senses] == ["ADJ"]
+
+    wt.apply_delta(remove=["ཀྱཱ་ཧ"])
+    assert [t.text for t in wt.tokenize("ཀྱཱ་ཧ་ཀ་")] == ["ཀྱཱ་", "ཧ་", "ཀ་"]
+    assert wt.tokenize("བཀྲ་ཤིས་")[0].pos == "ADJ"
+
+    # the previous version of the trie is left untouched
+    assert before.get_child("བཀྲ").get_child("ཤིས").data["senses"][0]["pos"] == "NOUN"
+
+
+def test_apply_delta_while_tokenizing(make_pack):
+    syls = ["ཀ", "ཁ", "ག", "ང", "ཅ", "ཆ", "ཇ", "ཉ", "ཏ", "ཐ", "ད", "ན", "པ", "ཕ", "བ", "མ"]
+    words = [f"{a}་{b}" for a in syls for b in syls]
+    wt = WordTokenizer(config=Config.from_path(make_pack(f"{w}\tNOUN" for w in words)))
+    # the deltas only change the pos of the words, not the segmentation
+    strings = ["་".join(words[i::7]) + "་" for i in range(7)]
+    expected = [[t.text for t in wt.tokenize(s)] for s in strings]
+    errors = []
+    done = threading.Event()
+
+    def tokenize():
+        try:
+            while not done.is_set():
+                for string, texts in zip(strings, expected):
+                    assert [t.text for t in wt.tokenize(string)] == texts
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=tokenize) for _ in range(2)]
+    for t in threads:
+        t.start()
+    try:
+        for i in range(20):
+            pos = "ADJ" if i % 2 else "NOUN"
+            wt.apply_delta(words=[f"{w}\t{pos}" for w in words[i::20]])
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+
+    assert not errors
+    assert wt.tokenize(words[19] + "་")[0].pos == "ADJ"
+    assert wt.tokenize(words[18] + "་")[0].pos == "NOUN"
+
+
+def test_tokenize_columnar(rules_wt):
+    from botok.tokenizers.columnar import AFFIX, AFFIX_HOST, MERGED_DAGDRA
+
+    wt = rules_wt
+    string = "བཀྲ་ཤིས་པ་ མཐའི་རྒྱ་མཚོ། རྒྱལ་པོས་ཀྵ་abc"
+    for split_affixes in [True, False]:
+        tokens = wt.tokenize(string, split_affixes=split_affixes)
+        columns = wt.tokenize_columnar(string, split_affixes=split_affixes)
+        assert len(columns) == len(tokens)
+        for i, t in enumerate(tokens):
+            assert columns.get_text(i) == t.text
+            assert (columns.starts[i], columns.lengths[i]) == (t.start, t.len)
+            assert chunk_values[columns.chunk_types[i]] == t.chunk_type
+            assert (columns.get_pos(i), columns.get_lemma(i)) == (t.pos, t.lemma)
+            flags = columns.flags[i]
+            assert bool(flags & AFFIX) == bool(t.affix)
+            assert bool(flags & AFFIX_HOST) == bool(t.affix_host)
+            assert bool(flags & MERGED_DAGDRA) == bool(t.has_merged_dagdra)
+
+    columns = wt.tokenize_columnar(string)
+    assert [columns.get_text(i) for i in range(4)] == ["བཀྲ་ཤིས་པ་ ", "མཐ", "འི་", "རྒྱ་"]
+    assert columns.flags[0] & MERGED_DAGDRA and columns.flags[1] & AFFIX_HOST
+    assert columns.get_pos(2) == "PART" and columns.get_lemma(1) == "མཐའ་"
+
+    # unlike tokenize(), the adjustment rules are not applied
+    assert [t.text for t in wt.tokenize("ལ་ལ་ལ་ལ་")] == ["ལ་", "ལ་ལ་", "ལ་"]
+    columns = wt.tokenize_columnar("ལ་ལ་ལ་ལ་")
+    assert [columns.get_text(i) for i in range(len(columns))] == ["ལ་ལ་", "ལ་ལ་"]
+
+
+def test_segment(rules_wt):
+    wt = rules_wt
+    # the rules of the pack split and merge the tokens of "ལ་ལ་ལ་ལ་"
+    string = "བཀྲ་ཤིས་པ་ མཐའི་རྒྱ་མཚོ། ཀཀ ལ་ལ་ལ་ལ་ abc"
+    for split_affixes in [True, False]:
+        tokens = wt.tokenize(string, split_affixes=split_affixes)
+        bounds = wt.segment(string, split_affixes=split_affixes)
+        assert bounds == [(t.start, t.start + t.len) for t in tokens]
+    assert wt.segment("ལ་ལ་ལ་ལ་") == [(0, 2), (2, 6), (6, 8)]
+    assert wt.segment("མཐའི་")[:2] == [(0, 2), (2, 5)]
+
+    # without rules changing the boundaries, they are found without tokenize()
+    wt.adj = AdjustTokens()
+    wt.tokenize = None
+    assert wt.segment("ལ་ལ་ལ་ལ་") == [(0, 4), (4, 8)]
+
+
+def test_tokenize_many(rules_wt, tmp_path):
+    wt = rules_wt
+    strings = [f"བཀྲ་ཤིས་པ་ {i} མཐའི་རྒྱ་མཚོ། ལ་ལ་ལ་ལ་" for i in range(50)]
+    expected = [[(t.text, t.pos) for t in wt.tokenize(s)] for s in strings]
+    for workers in [1, 3]:
+        results = wt.tokenize_many(iter(strings), workers=workers, chunksize=4)
+        assert [[(t.text, t.pos) for t in tokens] for tokens in results] == expected
+    bounds = list(wt.tokenize_many(strings, workers=2, method="segment"))
+    assert bounds == [wt.segment(s) for s in strings]
+
+    # spawned workers load the trie saved on disk
+    bounds = wt.tokenize_many(strings[:8], workers=2, method="segment", mp_context="spawn")
+    assert list(bounds) == [wt.segment(s) for s in strings[:8]]
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return
+
+    # the workers are forked, so they inherit the patched method
+    tokenize = wt.tokenize
+    marker = tmp_path / "crashed"
+
+    def crash_once(string, **kwargs):
+        if string == strings[21] and not marker.exists():
+            marker.touch()
+            os._exit(1)
+        return tokenize(string, **kwargs)
+
+    wt.tokenize = crash_once
+    results = wt.tokenize_many(strings, workers=3, chunksize=4, mp_context="fork")
+    assert [[(t.text, t.pos) for t in tokens] for tokens in results] == expected
+    assert marker.exists()
+
+    def always_crash(string, **kwargs):
+        if string == strings[21]:
+            os._exit(1)
+        return tokenize(string, **kwargs)
+
+    wt.tokenize = always_crash
+    with pytest.raises(RuntimeError):
+        list(wt.tokenize_many(strings, workers=3, chunksize=4, mp_context="fork"))
+    wt.tokenize = tokenize
+
+    # the changes of apply_delta() are only seen by forked workers
+    wt.apply_delta(words=["མཐའ\tADJ"])
+    expected = [[(t.text, t.pos) for t in wt.tokenize(s)] for s in strings]
+    results = wt.tokenize_many(strings, workers=2, mp_context="fork")
+    assert [[(t.text, t.pos) for t in tokens] for tokens in results] == expected
+    with pytest.raises(ValueError):
+        list(wt.tokenize_many(strings, workers=2, mp_context="spawn"))
+
+
+def test_tokenize_parallel(rules_wt):
+    wt = rules_wt
+    # the adjustment rules fire on "ལ་ལ་ལ་ལ་" in every piece
+    string = "བཀྲ་ཤིས་པ་ མཐའི་རྒྱ་མཚོ། ཀཀ། པ་ ༡༢ ལ་ལ་ལ་ལ་ བཀྲ་ཤིས། " * 30
+    expected = [str(t) for t in wt.tokenize(string)]
+    for workers in [1, 2]:
+        tokens = wt.tokenize_parallel(string, workers=workers, piece_size=50)
+        assert [str(t) for t in tokens] == expected
+        assert all(t.text == string[t.start : t.start + t.len] for t in tokens)
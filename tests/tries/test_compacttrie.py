@@ -0,0 +1,96 @@
+# coding: utf8
+from botok import BasicTrie, BoSyl, Config, TokChunks, Tokenize, Trie
+from botok.tries.compacttrie import CompactNode
+
+
+def syls(string):
+    return TokChunks(string).get_syls()
+
+
+def test_compact_trie():
+    trie = BasicTrie(compact=True)
+    assert isinstance(trie.head, CompactNode)
+
+    words = "hello goo good goodbye help gerald gold tea ted team to too tom stan standard money"
+    for w in words.split():
+        trie.add(w)
+
+    assert trie.has_word("goodbye") == {"data": {"_": {}}, "exists": True}
+    assert trie.has_word("goodb")["exists"] is False
+
+    trie.add_data("goodbye", {"pos": "NOUN"})
+    trie.add_data("goodbye", {"pos": "VERB", "lemma": "goodbye"})
+    assert trie.has_word("goodbye") == {
+        "exists": True,
+        "data": {
+            "_": {},
+            "senses": [{"pos": "NOUN"}, {"pos": "VERB", "lemma": "goodbye"}],
+        },
+    }
+
+    trie.deactivate("goodbye")
+    assert trie.has_word("goodbye")["exists"] is False
+    trie.deactivate("goodbye", rev=True)
+    assert trie.has_word("goodbye")["exists"] is True
+
+    current_node = None
+    for char in "goodbye":
+        current_node = trie.walk(char, current_node)
+    assert current_node.label == "e"
+    assert current_node.leaf is True
+    assert current_node.is_match()
+    assert not current_node.can_walk()
+    assert trie.walk("x", current_node) is None
+    assert sorted(trie["g"].children) == ["e", "o"]
+
+
+def test_compact_backend(tmp_path):
+    config = Config.from_path("./tests/data/trie_dialect_pack")
+    node = Trie(BoSyl, "POS", config.dictionary, config.adjustments, pickle_path=tmp_path)
+    compact = Trie(
+        BoSyl,
+        "POS",
+        config.dictionary,
+        config.adjustments,
+        pickle_path=tmp_path,
+        backend="compact",
+    )
+    assert isinstance(compact.head, CompactNode)
+    for word in ["ལྟར་", "ལྟ་", "བཀྲ་ཤིས་", "བཀྲིས་", "ཀཀ་", "ཀ་རར་", "ང་"]:
+        assert compact.has_word(syls(word)) == node.has_word(syls(word))
+
+    in_str = "ལྟར་བཀྲ་ཤིས། ཀཀ ང་ཀ་རར་ abc"
+    tokens = []
+    for trie in [node, compact]:
+        preproc = TokChunks(in_str)
+        preproc.serve_syls_to_trie()
+        tokens.append([str(t) for t in Tokenize(trie).tokenize(preproc)])
+    assert tokens[0] == tokens[1]
+
+
+def test_compact_flat_file(tmp_path, make_pack):
+    pack = make_pack(["བཀྲ་ཤིས\tNOUN", "གྲུབ་མཐའ\tNOUN\t\tsense"])
+    config = Config.from_path(pack)
+
+    tries = []
+    for _ in range(2):
+        tries.append(
+            Trie(
+                BoSyl,
+                "POS",
+                config.dictionary,
+                {},
+                pickle_path=tmp_path,
+                backend="compact",
+            )
+        )
+    built, loaded = tries
+    assert built.mapped_file.is_file()
+    assert not built.pickled_file.exists()
+
+    # the second trie is loaded from the flat file, keeping the ids of the nodes
+    assert isinstance(loaded.head, CompactNode)
+    assert loaded.head.trie.base is not None
+    assert len(loaded.head.trie) == len(built.head.trie)
+    for word in ["བཀྲ་ཤིས་", "བཀྲ་ཤིསའམ་", "གྲུབ་མཐའི་", "བཀྲ་"]:
+        assert loaded.has_word(syls(word)) == built.has_word(syls(word))
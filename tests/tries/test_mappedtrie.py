@@ -0,0 +1,154 @@
+# coding: utf8
+import pickle
+from copy import deepcopy
+
+from botok import (
+    BoSyl,
+    Config,
+    MappedTrie,
+    TokChunks,
+    Tokenize,
+    Trie,
+    WordTokenizer,
+    convert_pickled_trie,
+)
+from botok.tries.basictrie import Node
+from botok.tries.mappedtrie import MappedNode, write_mapped_trie
+
+
+def syls(string):
+    return TokChunks(string).get_syls()
+
+
+def test_mapped_trie(tmp_path):
+    head = Node()
+    head.data["_"]["version"] = "test"
+    words = "hello goo good goodbye help gerald gold tea ted team to too tom stan standard money"
+    for w in words.split():
+        node = head
+        for char in w:
+            node = node.get_child(char) or node.add_child(char)
+        node.leaf = True
+    head["g"]["o"]["o"]["d"].data["senses"] = [{"pos": "ADJ"}]
+    head["t"]["e"]["a"].data["senses"] = [{"pos": "NOUN"}, {"pos": "ADJ"}]
+    head["t"]["e"]["a"].data["freq"] = 10
+
+    write_mapped_trie(head, tmp_path / "test.mapped", version="test", pack_digest="abc")
+    trie = MappedTrie(tmp_path / "test.mapped")
+    assert trie.version == "test"
+    assert trie.metadata == {"pack_digest": "abc"}
+
+    # the records shared by several nodes are stored once
+    assert len(trie.node_records) == 7
+    assert len(trie.record_offsets) - 1 == 5
+    assert trie.head["t"]["e"]["a"].data == {
+        "_": {},
+        "senses": [{"pos": "NOUN"}, {"pos": "ADJ"}],
+        "freq": 10,
+    }
+
+    node = trie.head
+    for char in "good":
+        node = node.get_child(char)
+    assert isinstance(node, MappedNode)
+    assert node.label == "d"
+    assert node.is_match()
+    assert node.can_walk()
+    assert node.data == {"_": {}, "senses": [{"pos": "ADJ"}]}
+    assert node.get_child("x") is None
+    assert sorted(trie.head["g"].children) == ["e", "o"]
+
+    # changes are kept in memory, on top of the mapped file
+    node.leaf = False
+    new = node.add_child("s")
+    new.leaf = True
+    assert not trie.head["g"]["o"]["o"]["d"].is_match()
+    assert trie.head["g"]["o"]["o"]["d"]["s"].is_match()
+    assert MappedTrie(tmp_path / "test.mapped").head["g"]["o"]["o"]["d"].is_match()
+
+
+def test_mmap_backend(tmp_path):
+    config = Config.from_path("./tests/data/trie_dialect_pack")
+    node = Trie(BoSyl, "POS", config.dictionary, config.adjustments, pickle_path=tmp_path)
+
+    # the mapped file is converted from the existing pickled trie
+    mapped = Trie(
+        BoSyl,
+        "POS",
+        config.dictionary,
+        config.adjustments,
+        pickle_path=tmp_path,
+        backend="mmap",
+    )
+    assert mapped.mapped_file.is_file()
+    assert isinstance(mapped.head, MappedNode)
+
+    for word in ["ལྟར་", "ལྟ་", "བཀྲ་ཤིས་", "བཀྲིས་", "ཀཀ་", "ཀ་རར་", "ང་"]:
+        assert mapped.has_word(syls(word)) == node.has_word(syls(word))
+
+    in_str = "ལྟར་བཀྲ་ཤིས། ཀཀ ང་ཀ་རར་ abc"
+    tokens = []
+    for trie in [node, mapped]:
+        preproc = TokChunks(in_str)
+        preproc.serve_syls_to_trie()
+        tokens.append([str(t) for t in Tokenize(trie).tokenize(preproc)])
+    assert tokens[0] == tokens[1]
+
+
+def test_convert_pickled_trie(tmp_path):
+    config = Config.from_path("./tests/data/trie_dialect_pack")
+    trie = Trie(BoSyl, "POS", config.dictionary, {}, pickle_path=tmp_path)
+    convert_pickled_trie(trie.pickled_file, tmp_path / "POS.mapped")
+    mapped = MappedTrie(tmp_path / "POS.mapped")
+
+    with trie.pickled_file.open("rb") as f:
+        head = pickle.load(f)
+    assert mapped.version == head.data["_"]["version"]
+    assert mapped.head.children.keys() == head.children.keys()
+
+
+def test_walk_id(tmp_path):
+    config = Config.from_path("./tests/data/trie_dialect_pack")
+    for backend in ["node", "compact", "mmap"]:
+        trie = Trie(
+            BoSyl, "POS", config.dictionary, {}, pickle_path=tmp_path, backend=backend
+        )
+        trie.inflect_n_modify_trie("ཀྱཱ་ཧ་")  # not in the file of the mapped trie
+
+        for word in ["ཀྱཱ་ཧ་", "ཀྱཱ་ཧས་", "ལྟ་", "ཀྱཱ་"]:
+            node = None
+            for syl in syls(word):
+                node = trie.walk_id(trie.get_syl_id(syl), node)
+            expected = trie.has_word(syls(word))["exists"]
+            assert bool(node and node.is_match()) == expected
+        assert trie.get_syl_id("xyz") in [None, "xyz"]
+        assert trie.walk_id(trie.get_syl_id("xyz")) is None
+
+
+def test_lazy_payloads(tmp_path):
+    config = Config.from_path("./tests/data/trie_dialect_pack")
+    trie = Trie(BoSyl, "POS", config.dictionary, {}, pickle_path=tmp_path)
+    for word in ["བཀྲ་", "བཀྲ་ཤིས་"]:
+        trie.inflect_n_modify_trie(word)
+        trie.inflect_n_add_data(word + "\tNOUN")
+    write_mapped_trie(trie.head, tmp_path / "test.mapped")
+    trie.head = MappedTrie(tmp_path / "test.mapped").head
+
+    preproc = TokChunks("བཀྲ་ཤིས་")
+    preproc.serve_syls_to_trie()
+    tokens = Tokenize(trie).tokenize(preproc)
+    assert [t.text for t in tokens] == ["བཀྲ་ཤིས་"]
+    assert tokens[0].senses == [{"pos": "NOUN", "affixed": False}]
+
+    # the decoded data is not kept in memory, the file stays the only copy
+    assert trie.head.trie.data_changes == {}
+
+
+def test_tokenize_keeps_no_payloads(rules_pack):
+    wt = WordTokenizer(config=Config.from_path(rules_pack), trie_backend="mmap")
+    mapped = wt.tok.trie.head.trie
+    # only the nodes modified by the adjustments of the pack hold their data in memory
+    changes = {idx: deepcopy(data) for idx, data in mapped.data_changes.items()}
+    tokens = wt.tokenize("བཀྲ་ཤིས་པ་ མཐའི་རྒྱལ་པོ། ལ་ལ་ལ་ལ་")
+    assert [t.pos for t in tokens][:1] == ["NOUN"]
+    assert mapped.data_changes == changes
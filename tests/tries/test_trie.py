@@ -1,8 +1,13 @@
 # coding: utf8
+import json
+import shutil
 from collections import defaultdict
+from copy import deepcopy
 from pathlib import Path
 
-from botok import BoSyl, Config, TokChunks, Trie
+import pytest
+
+from botok import BoSyl, Config, TokChunks, Trie, WordTokenizer
 
 
 def syls(string):
@@ -70,3 +75,178 @@ def test_multiple_words_per_entry():
     assert {"lemma": "ལྟར་", "pos": "ADV", "freq": 456, "affixed": False} in res[
         "data"
     ]["senses"]
+
+
+def test_incremental_update(tmp_path, make_pack):
+    pack = make_pack(["གྲུབ་མཐའ\tNOUN", "བཀྲ་ཤིས\tNOUN"])
+    words = pack / "dictionary" / "words" / "empty.tsv"
+
+    def load():
+        config = Config.from_path(pack)
+        return Trie(BoSyl, "POS", config.dictionary, {}, pickle_path=tmp_path)
+
+    trie = load()
+    assert (tmp_path / "POS_trie.manifest").is_file()
+    assert trie.has_word(syls("གྲུབ་མཐའི་"))["exists"]
+
+    # a word is removed, another one has a new sense
+    words.write_text("བཀྲ་ཤིས\tVERB\n", encoding="utf-8")
+    updated = load()
+    assert not updated.has_word(syls("གྲུབ་མཐའ་"))["exists"]
+    assert not updated.has_word(syls("གྲུབ་མཐའི་"))["exists"]
+    assert updated.has_word(syls("བཀྲ་ཤིས་"))["data"]["senses"] == [
+        {"pos": "VERB", "affixed": False}
+    ]
+
+    # the updated trie was saved
+    reloaded = load()
+    assert reloaded.has_word(syls("བཀྲ་ཤིས་")) == updated.has_word(syls("བཀྲ་ཤིས་"))
+
+
+def test_parallel_build(tmp_path, make_pack):
+    pack = make_pack(
+        [
+            "གྲུབ་མཐའ\tNOUN\t\tsense",
+            "བཀྲ་ཤིས\tNOUN",
+            "བཀྲ་ཤིས\tVERB\tབཀྲ་ཤིས་",
+            "ཀ་ར\tNOUN",
+        ]
+    )
+    config = Config.from_path(pack)
+
+    tries = []
+    for processes in [1, 2]:
+        path = tmp_path / str(processes)
+        path.mkdir()
+        tries.append(
+            Trie(
+                BoSyl,
+                "POS",
+                config.dictionary,
+                config.adjustments,
+                pickle_path=path,
+                build=True,
+                processes=processes,
+            )
+        )
+
+    for word in ["གྲུབ་མཐའི་", "བཀྲ་ཤིས་", "ཀ་རར་", "ཀ་ར་", "ལྟར་"]:
+        assert tries[0].has_word(syls(word)) == tries[1].has_word(syls(word))
+
+
+def test_overlay(tmp_path):
+    config = Config.from_path("./tests/data/trie_dialect_pack")
+    base = Trie(BoSyl, "POS", config.dictionary, {}, pickle_path=tmp_path, overlay=True)
+    custom = Trie(
+        BoSyl,
+        "POS",
+        config.dictionary,
+        config.adjustments,
+        pickle_path=tmp_path,
+        base=base,
+    )
+    assert custom.main_head is base.main_head
+    assert custom.has_word(syls("ལྟར་"))["exists"]
+    assert custom.has_word(syls("ཀ་རར་"))["data"]["skrt"]
+
+    # the changes are recorded on top of the base, which is left untouched
+    custom.inflect_n_modify_trie("ཀྱཱ་ཧ་")
+    custom.inflect_n_add_data("ཀྱཱ་ཧ\tNOUN")
+    assert custom.has_word(syls("ཀྱཱ་ཧ་"))["data"]["senses"] == [
+        {"pos": "NOUN", "affixed": False}
+    ]
+    custom.deactivate(syls("ཀྱཱ་ཧ་"))
+    assert not custom.has_word(syls("ཀྱཱ་ཧ་"))["exists"]
+    for word in ["ལྟར་", "ཀ་རར་", "ཀྱཱ་ཧ་"]:
+        assert not base.has_word(syls(word))["exists"]
+
+    other = Trie(BoSyl, "POS", config.dictionary, {}, pickle_path=tmp_path, base=base)
+    assert not other.has_word(syls("ལྟར་"))["exists"]
+
+    direct = Trie(
+        BoSyl, "POS", config.dictionary, config.adjustments, pickle_path=tmp_path
+    )
+    with pytest.raises(ValueError):
+        Trie(BoSyl, "POS", config.dictionary, {}, pickle_path=tmp_path, base=direct)
+
+
+def count_deltas(trie):
+    n, stack = 0, [trie.head.overlay.root]
+    while stack:
+        delta = stack.pop()
+        n += 1
+        stack.extend(delta.children.values())
+    return n
+
+
+def test_overlay_reads(make_pack):
+    pack = make_pack(["བཀྲ་ཤིས\tNOUN", "མཐའ\tNOUN"])
+    config = Config.from_path(pack)
+    base = WordTokenizer(config=config, trie_overlay=True)
+    custom = WordTokenizer(config=config, base=base)
+    trie = custom.tok.trie
+    n_deltas = count_deltas(trie)
+    base_data = deepcopy(base.tok.trie.main_head.get_child("བཀྲ").get_child("ཤིས").data)
+
+    # tokenizing only reads the overlay and its base
+    tokens = custom.tokenize("བཀྲ་ཤིས་མཐའི་ལྟར་བཀྲ་ཤིས་")
+    assert tokens[0].lemma == "བཀྲ་ཤིས་"
+    assert count_deltas(trie) == n_deltas
+    node = base.tok.trie.main_head.get_child("བཀྲ").get_child("ཤིས")
+    assert node.data == base_data
+
+
+def test_apply_delta_shared_forms(tmp_path):
+    config = Config.from_path("./tests/data/trie_dialect_pack")
+    trie = Trie(BoSyl, "POS", config.dictionary, {}, pickle_path=tmp_path)
+    # "བཀྲས" is an inflected form of "བཀྲ" and a word of its own
+    for line in ["བཀྲ\tNOUN", "བཀྲས\tVERB"]:
+        trie._add_one_line(line, "words")
+
+    def senses(word):
+        return sorted(
+            (s["pos"], s["affixed"]) for s in trie.has_word(syls(word))["data"]["senses"]
+        )
+
+    assert senses("བཀྲས་") == [("NOUN", True), ("VERB", False)]
+
+    # only the senses of the updated word are replaced
+    trie.apply_delta(words=["བཀྲ\tADJ"])
+    assert senses("བཀྲ་") == [("ADJ", False)]
+    assert senses("བཀྲས་") == [("ADJ", True), ("VERB", False)]
+    trie.apply_delta(words=["བཀྲས\tADV"])
+    assert senses("བཀྲས་") == [("ADJ", True), ("ADV", False)]
+    assert senses("བཀྲའི་") == [("ADJ", True)]
+
+    # rebuilding the trie drops the deltas
+    assert trie.deltas == 2
+    trie.rebuild_trie()
+    assert trie.deltas == 0
+
+
+def test_manifest_moves_with_pack(tmp_path, rules_pack, monkeypatch):
+    def load(pack):
+        config = Config.from_path(pack)
+        return Trie(BoSyl, "POS", config.dictionary, {}, pickle_path=pack.parent)
+
+    load(rules_pack)
+    manifest = json.loads((tmp_path / "POS_trie.manifest").read_text(encoding="utf-8"))
+    paths = [f["path"] for f in manifest["files"]]
+    assert "dictionary/words/empty.tsv" in paths
+    # the manifest keeps hashes of the lines, not the lines
+    assert "བཀྲ་ཤིས\tNOUN" not in json.dumps(manifest, ensure_ascii=False)
+
+    # the pack and its trie are moved: the trie is updated, not rebuilt
+    moved = tmp_path / "moved"
+    moved.mkdir()
+    for name in ["POS", "POS_trie.pickled", "POS_trie.manifest"]:
+        shutil.move(str(tmp_path / name), str(moved / name))
+    (moved / "POS" / "dictionary" / "words" / "empty.tsv").write_text(
+        "བཀྲ་ཤིས\tVERB\n", encoding="utf-8"
+    )
+    monkeypatch.setattr(Trie, "_build_trie", lambda self: pytest.fail("rebuilt"))
+    trie = load(moved / "POS")
+    assert trie.has_word(syls("བཀྲ་ཤིས་"))["data"]["senses"] == [
+        {"pos": "VERB", "affixed": False}
+    ]
+    assert not trie.has_word(syls("རྒྱལ་པོ་"))["exists"]